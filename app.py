@@ -1,10 +1,18 @@
-from flask import Flask, render_template, send_file, request, jsonify, send_from_directory
-import json
+from flask import Flask, Response, render_template, send_file, request, jsonify, send_from_directory
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
+import orjson
+import hashlib
 import logging
 import os
 import tempfile
+import threading
 from datetime import datetime
-from modules import ClaudeAI, GCPOps, PDFOps, SegmentationOps
+from dotenv import load_dotenv
+from modules import ClaudeAI, GCPOps, SaveQueue
+
+# Load environment variables from .env file
+load_dotenv()
 
 # Configure logging
 logging.basicConfig(
@@ -13,8 +21,48 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that uses orjson for jsonify and request parsing"""
+
+    def _options(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Build jsonify responses straight from orjson bytes, skipping the str round-trip"""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE),
+            mimetype=self.mimetype
+        )
+
+
 app = Flask(__name__)
-app.secret_key = os.urandom(24)
+app.json = OrjsonProvider(app)
+
+# Compress JSON and HTML responses for clients that accept it
+COMPRESS_ALGORITHMS = ['br', 'gzip']
+app.config['COMPRESS_ALGORITHM'] = COMPRESS_ALGORITHMS
+app.config['COMPRESS_MIN_SIZE'] = 1024
+Compress(app)
+
+# A fixed key keeps signed cookies valid across workers and restarts
+FLASK_SECRET_KEY = os.getenv('FLASK_SECRET_KEY')
+if FLASK_SECRET_KEY:
+    app.secret_key = FLASK_SECRET_KEY.encode('utf-8')
+else:
+    logger.warning("FLASK_SECRET_KEY is not set; using a random per-process secret key")
+    app.secret_key = os.urandom(24)
 
 # Constants
 SESSION_ID = 'eb9db0ca54e94dbc82cffdab497cde13'
@@ -28,20 +76,94 @@ BUCKET_SEGMENTATION_LABELS = 'papers-diatoms-segmentation'
 
 # Global variables for data management
 PAPERS_JSON_PUBLIC_URL = f"https://storage.googleapis.com/{PAPERS_BUCKET_JSON_FILES}/jsons_from_pdfs/{SESSION_ID}/{SESSION_ID}.json"
+PAPERS_JSON_CACHE_PATH = os.path.join(tempfile.gettempdir(), f"diatoms_{SESSION_ID}.json")
 PAPER_JSON_FILES = []
 DIATOMS_DATA = []
+PAPER_BY_IMAGE_URL = {}
+DIATOM_BY_IMAGE_URL = {}
+INDEX_CACHE = []  # (payload, etag) of /api/diatoms responses, filled lazily per image index
+LABELS_CACHE = {}  # image index -> list of labels used by the species assistant
+DOWNLOAD_CACHE = None  # (payload, etag) of the /api/download response
+CACHE_GENERATION = 0  # bumped on every invalidation; a fill only stores its entry if it is unchanged
+_cache_lock = threading.Lock()
 
 # Initialize GCP operations
 gcp_ops = GCPOps()
 
-def initialize_data():
-    """Initialize paper data and diatoms data"""
+def build_image_url_indexes():
+    """Rebuild the image_url lookup tables and reset the per-index caches"""
+    global PAPER_BY_IMAGE_URL, DIATOM_BY_IMAGE_URL, INDEX_CACHE, LABELS_CACHE, DOWNLOAD_CACHE, CACHE_GENERATION
+    
+    # setdefault keeps the first entry for duplicate URLs, matching the old linear scans
+    PAPER_BY_IMAGE_URL = {}
+    for paper in PAPER_JSON_FILES:
+        if isinstance(paper.get('diatoms_data'), dict):
+            PAPER_BY_IMAGE_URL.setdefault(paper['diatoms_data'].get('image_url'), paper)
+    
+    DIATOM_BY_IMAGE_URL = {}
+    for data in DIATOMS_DATA:
+        DIATOM_BY_IMAGE_URL.setdefault(data.get('image_url'), data)
+    
+    with _cache_lock:
+        CACHE_GENERATION += 1
+        INDEX_CACHE = [None] * len(DIATOMS_DATA)
+        LABELS_CACHE = {}
+        DOWNLOAD_CACHE = None
+
+
+def invalidate_image_cache(image_index):
+    """Drop cached responses that include the given image after its info changes"""
+    global DOWNLOAD_CACHE, CACHE_GENERATION
+    
+    with _cache_lock:
+        CACHE_GENERATION += 1
+        INDEX_CACHE[image_index] = None
+        LABELS_CACHE.pop(image_index, None)
+        DOWNLOAD_CACHE = None
+
+
+def make_etag(payload):
+    """Return a short content hash of an encoded response body"""
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def conditional_json_response(payload, etag, **kwargs):
+    """Return payload as JSON, or 304 Not Modified if the client already has this ETag"""
+    # Flask-Compress appends ':<algorithm>' to the ETag of compressed responses
+    for tag in [etag] + [f"{etag}:{algorithm}" for algorithm in COMPRESS_ALGORITHMS]:
+        if request.if_none_match.contains(tag):
+            response = Response(status=304)
+            response.set_etag(tag)
+            break
+    else:
+        response = Response(payload, mimetype='application/json', **kwargs)
+        response.set_etag(etag)
+    
+    response.cache_control.no_cache = True
+    return response
+
+
+def initialize_data(force_refresh=False):
+    """Initialize paper data and diatoms data, reusing the local cache when it is current"""
     global PAPER_JSON_FILES, DIATOMS_DATA
     
     try:
-        PAPER_JSON_FILES = gcp_ops.load_paper_json_files(PAPERS_JSON_PUBLIC_URL)
+        PAPER_JSON_FILES = gcp_ops.load_paper_json_files_cached(
+            PAPERS_JSON_PUBLIC_URL,
+            PAPERS_JSON_CACHE_PATH,
+            force_refresh=force_refresh
+        )
+        
+        # Parse diatoms_data once so request handlers can rely on dicts
+        for paper in PAPER_JSON_FILES:
+            diatoms_data = paper.get('diatoms_data')
+            if isinstance(diatoms_data, str):
+                paper['diatoms_data'] = orjson.loads(diatoms_data)
+        
         if PAPER_JSON_FILES:
-            DIATOMS_DATA = ClaudeAI.get_DIATOMS_DATA(PAPERS_JSON_PUBLIC_URL)
+            # Seed the saved digest so a save with no edits since loading skips the upload
+            ClaudeAI.record_saved_papers(PAPERS_JSON_PUBLIC_URL, PAPER_JSON_FILES)
+            DIATOMS_DATA = ClaudeAI.extract_diatoms_data(PAPER_JSON_FILES)
             logger.info(f"Successfully loaded {len(DIATOMS_DATA)} diatom entries")
         else:
             logger.warning("No paper JSON files found")
@@ -51,11 +173,53 @@ def initialize_data():
         logger.error(f"Error loading paper data: {str(e)}")
         PAPER_JSON_FILES = []
         DIATOMS_DATA = []
+    
+    build_image_url_indexes()
 
 
 initialize_data()
 
 
+_data_load_lock = threading.Lock()
+
+
+def ensure_data_loaded():
+    """Load data if it is missing; concurrent callers wait for a single load"""
+    if not DIATOMS_DATA:
+        with _data_load_lock:
+            if not DIATOMS_DATA:
+                initialize_data()
+    return DIATOMS_DATA
+
+
+_claude = None
+_claude_lock = threading.Lock()
+
+
+def get_claude():
+    """Return a shared ClaudeAI instance so its HTTP client and connections are reused"""
+    global _claude
+    
+    if _claude is None:
+        with _claude_lock:
+            if _claude is None:
+                _claude = ClaudeAI()
+    return _claude
+
+
+def persist_papers():
+    """Write the in-memory papers and diatoms data back to GCS"""
+    return get_claude().update_and_save_papers(
+        PAPERS_JSON_PUBLIC_URL,
+        PAPER_JSON_FILES,
+        DIATOMS_DATA
+    )
+
+
+# Coalesce rapid label edits into a single GCS upload
+save_queue = SaveQueue(persist_papers, delay=2.0)
+
+
 def save_labels(updated_data):
     """Save updated labels and synchronize data structures"""
     global PAPER_JSON_FILES, DIATOMS_DATA
@@ -66,25 +230,13 @@ def save_labels(updated_data):
         
         if 0 <= image_index < len(DIATOMS_DATA):
             DIATOMS_DATA[image_index]['info'] = info
+            invalidate_image_cache(image_index)
             
-            for paper in PAPER_JSON_FILES:
-                if 'diatoms_data' in paper:
-                    if isinstance(paper['diatoms_data'], str):
-                        paper['diatoms_data'] = json.loads(paper['diatoms_data'])
-                    
-                    if paper['diatoms_data'].get('image_url') == DIATOMS_DATA[image_index].get('image_url'):
-                        paper['diatoms_data']['info'] = info
-                        break
+            paper = PAPER_BY_IMAGE_URL.get(DIATOMS_DATA[image_index].get('image_url'))
+            if paper:
+                paper['diatoms_data']['info'] = info
             
-            success = ClaudeAI.update_and_save_papers(
-                PAPERS_JSON_PUBLIC_URL,
-                PAPER_JSON_FILES,
-                DIATOMS_DATA
-            )
-            
-            if not success:
-                raise Exception("Failed to save updates to GCS")
-                
+            save_queue.schedule()
             return True
             
     except Exception as e:
@@ -136,9 +288,8 @@ def see_diatoms_data():
             raise ValueError("Required configuration variables are not set")
         
         papers_json_public_url = f"https://storage.googleapis.com/{PAPERS_BUCKET_JSON_FILES}/jsons_from_pdfs/{SESSION_ID}/{SESSION_ID}.json"
-        return render_template('diatoms_data.html', 
-                             json_url=papers_json_public_url,
-                             diatoms_data=DIATOMS_DATA)
+        # The template only shows the source URL, so the diatoms data is not passed in
+        return render_template('diatoms_data.html', json_url=papers_json_public_url)
     except Exception as e:
         logger.error(f"Error in diatoms_data route: {str(e)}")
         return render_template('error.html', error=str(e)), 500
@@ -146,14 +297,8 @@ def see_diatoms_data():
 @app.route('/label', methods=['GET', 'POST'])
 def label():
     """Main route for the labeling interface"""
-    global DIATOMS_DATA
-    
-    if not DIATOMS_DATA:
-        try:
-            DIATOMS_DATA = ClaudeAI.get_DIATOMS_DATA(PAPERS_JSON_PUBLIC_URL)
-        except Exception as e:
-            logger.error(f"Error loading diatoms data: {str(e)}")
-            return render_template('error.html', error="No diatom data available"), 404
+    if not ensure_data_loaded():
+        logger.warning("No diatoms data available for the labeling interface")
     
     return send_file('templates/label-react.html', mimetype='text/html')
 
@@ -165,8 +310,7 @@ def get_diatoms():
         
         if not DIATOMS_DATA:
             try:
-                DIATOMS_DATA = ClaudeAI.get_DIATOMS_DATA(PAPERS_JSON_PUBLIC_URL)
-                if not DIATOMS_DATA:
+                if not ensure_data_loaded():
                     return jsonify({
                         'current_index': 0,
                         'total_images': 0,
@@ -186,12 +330,20 @@ def get_diatoms():
         image_index = min(max(0, image_index), total_images - 1)
         
         try:
-            current_image_data = DIATOMS_DATA[image_index]
-            return jsonify({
-                'current_index': image_index,
-                'total_images': total_images,
-                'data': current_image_data
-            })
+            cached = INDEX_CACHE[image_index]
+            if cached is None:
+                # Read the generation before the data, so an edit during serialization is detected below
+                generation = CACHE_GENERATION
+                payload = orjson.dumps({
+                    'current_index': image_index,
+                    'total_images': total_images,
+                    'data': DIATOMS_DATA[image_index]
+                })
+                cached = (payload, make_etag(payload))
+                with _cache_lock:
+                    if generation == CACHE_GENERATION:
+                        INDEX_CACHE[image_index] = cached
+            return conditional_json_response(*cached)
             
         except IndexError:
             logger.error(f"Failed to get data for index {image_index}")
@@ -215,17 +367,18 @@ def get_diatoms():
 def save():
     """API endpoint to save label data"""
     try:
-        update_data = request.json
+        update_data = orjson.loads(request.get_data(cache=False))
         success = save_labels(update_data)
         
         if success:
             return jsonify({
                 'success': True,
-                'message': 'Labels saved successfully',
+                'queued': True,
+                'message': 'Labels queued for saving',
                 'timestamp': datetime.now().isoformat(),
                 'saved_index': update_data.get('image_index', 0),
                 'gcp_url': PAPERS_JSON_PUBLIC_URL
-            })
+            }), 202
         else:
             raise Exception("Failed to save labels")
             
@@ -239,75 +392,97 @@ def save():
 @app.route('/api/download', methods=['GET'])
 def download_labels():
     """Download endpoint for label data"""
+    global DOWNLOAD_CACHE
+    
     try:
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as temp_file:
-            json.dump(DIATOMS_DATA, temp_file, indent=4)
-            temp_path = temp_file.name
-        
-        try:
-            response = send_file(
-                temp_path,
-                mimetype='application/json',
-                as_attachment=True,
-                download_name=f'diatom_labels_{SESSION_ID}.json'
-            )
-            os.unlink(temp_path)
-            return response
-        except Exception as e:
-            os.unlink(temp_path)
-            raise e
+        cached = DOWNLOAD_CACHE
+        if cached is None:
+            generation = CACHE_GENERATION
+            payload = orjson.dumps(DIATOMS_DATA, option=orjson.OPT_INDENT_2)
+            cached = (payload, make_etag(payload))
+            with _cache_lock:
+                if generation == CACHE_GENERATION:
+                    DOWNLOAD_CACHE = cached
+        return conditional_json_response(
+            *cached,
+            headers={'Content-Disposition': f'attachment; filename=diatom_labels_{SESSION_ID}.json'}
+        )
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/reload', methods=['POST'])
+def reload_data():
+    """Admin endpoint to discard the local cache and reload papers from GCS"""
+    try:
+        # Write pending edits first; if they cannot be saved, reloading would discard them
+        if not save_queue.flush():
+            return jsonify({
+                'success': False,
+                'error': 'Pending edits could not be saved; reload aborted'
+            }), 503
+        with _data_load_lock:
+            initialize_data(force_refresh=True)
+        return jsonify({
+            'success': True,
+            'total_papers': len(PAPER_JSON_FILES),
+            'total_images': len(DIATOMS_DATA)
+        })
+    except Exception as e:
+        logger.error(f"Error in reload endpoint: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/diatom_list_assistant', methods=['GET'])
 def get_diatom_list_assistant():
     """API endpoint for diatom species identification assistance"""
     try:
         image_index = request.args.get('index', 0, type=int)
         
-        if not DIATOMS_DATA or image_index >= len(DIATOMS_DATA):
+        # Reject negative indexes too, so LABELS_CACHE is only ever keyed by canonical positions
+        if not DIATOMS_DATA or not 0 <= image_index < len(DIATOMS_DATA):
             return jsonify({
                 'error': 'No data available or invalid index'
             }), 404
 
         current_image_data = DIATOMS_DATA[image_index]
-        labels = [info['label'][0] for info in current_image_data.get('info', [])]
+        labels = LABELS_CACHE.get(image_index)
+        if labels is None:
+            generation = CACHE_GENERATION
+            labels = [info['label'][0] for info in current_image_data.get('info', [])]
+            with _cache_lock:
+                if generation == CACHE_GENERATION:
+                    LABELS_CACHE[image_index] = labels
         
-        pdf_text_content = ""
-        matching_paper = None
-        for paper in PAPER_JSON_FILES:
-            if isinstance(paper.get('diatoms_data'), str):
-                paper_diatoms_data = json.loads(paper['diatoms_data'])
-            else:
-                paper_diatoms_data = paper.get('diatoms_data', {})
-                
-            if paper_diatoms_data.get('image_url') == current_image_data.get('image_url'):
-                pdf_text_content = paper.get('pdf_text_content', '')
-                matching_paper = paper
-                break
+        matching_paper = PAPER_BY_IMAGE_URL.get(current_image_data.get('image_url'))
+        pdf_text_content = matching_paper.get('pdf_text_content', '') if matching_paper else ""
+        
+        # Without paper text there is nothing for Claude to search, so skip the API call
+        if not pdf_text_content:
+            return jsonify({
+                'labels': labels,
+                'pdf_text_content': '',
+                'species_data': [],
+                'labels_retrieved': [],
+                'message': 'No paper text available for this image',
+                'data_saved': False
+            })
 
-        claude = ClaudeAI()
+        claude = get_claude()
         reformatted_labels = claude.reformat_labels_to_spaces(labels)
         messages = claude.part3_create_missing_species_prompt_and_messages(pdf_text_content, reformatted_labels)
-        response = claude.get_completion(messages)
+        response = claude.get_completion(messages, required_keys=('species_data', 'labels_retrieved', 'message'))
 
         if isinstance(response, dict) and all(k in response for k in ['species_data', 'labels_retrieved', 'message']):
             if response['species_data']:
                 current_image_data['info'].extend(response['species_data'])
+                invalidate_image_cache(image_index)
                 
                 if matching_paper:
-                    if isinstance(matching_paper['diatoms_data'], str):
-                        matching_paper['diatoms_data'] = json.loads(matching_paper['diatoms_data'])
                     matching_paper['diatoms_data'] = current_image_data
-
-                    success = ClaudeAI.update_and_save_papers(
-                        PAPERS_JSON_PUBLIC_URL,
-                        PAPER_JSON_FILES,
-                        DIATOMS_DATA
-                    )
-                    if not success:
-                        logger.error("Failed to save updated data to GCP")
+                    save_queue.schedule()
 
             return jsonify({
                 'labels': labels,
@@ -328,9 +503,7 @@ def get_diatom_list_assistant():
         }), 500
 
 if __name__ == '__main__':
-    # Initialize data on startup
-    initialize_data()
-    
-    # Run the Flask app
+    # Data is already loaded at import time, which also covers each gunicorn worker.
+    # Run the development server threaded so slow GCS/Claude calls don't block other requests.
     port = int(os.environ.get('PORT', 8080))
-    app.run(host='0.0.0.0', port=port)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, threaded=True)
\ No newline at end of file
@@ -1,7 +1,29 @@
-from .installed_packages import get_installed_packages
-from .claudeAI import ClaudeAI
-from .gcpOps import GCPOps
-from .pdfOps import PDFOps
-from .segmentationOps import SegmentationOps
+import importlib
 
-__all__ = ['get_installed_packages', 'ClaudeAI', 'GCPOps', 'PDFOps', 'SegmentationOps']
\ No newline at end of file
+# Submodules are imported on first attribute access (PEP 562) so that importing one
+# class does not pull in the dependencies of all the others (PyMuPDF, pandas, ...).
+_LAZY_IMPORTS = {
+    'get_installed_packages': '.installed_packages',
+    'ClaudeAI': '.claudeAI',
+    'GCPOps': '.gcpOps',
+    'PDFOps': '.pdfOps',
+    'SegmentationOps': '.segmentationOps',
+    'SaveQueue': '.saveQueue',
+    'ExtractionCache': '.extractionCache',
+    'TokenBudgetTracker': '.tokenBudgetTracker',
+}
+
+__all__ = ['get_installed_packages', 'ClaudeAI', 'GCPOps', 'PDFOps', 'SegmentationOps', 'SaveQueue', 'ExtractionCache', 'TokenBudgetTracker']
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
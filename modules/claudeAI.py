@@ -1,12 +1,25 @@
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic, APIConnectionError, APIStatusError, RateLimitError
+from concurrent.futures import ThreadPoolExecutor
+from google.api_core.exceptions import NotFound
 from google.cloud import storage
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Optional, Any, Union, Tuple
+from typing import Callable, List, Dict, Final, Optional, Any, Union, Tuple
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+import gzip
 import json
+import orjson
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import threading
+import time
+
+from .extractionCache import ExtractionCache
+from .tokenBudgetTracker import TokenBudgetTracker
 
 # Load environment variables from .env file
 load_dotenv()
@@ -18,44 +31,501 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Maximum number of Claude requests in flight during batch processing; keep within the account's RPM tier
+DEFAULT_MAX_CONCURRENCY = 10
+
+# Character budget for PDF text in a single request (~30k tokens at 4 chars/token). Kept well below the
+# 200k-token context so dense text (species names, tables) plus the prompt and the 8k-token response still
+# fits, and so one request uses a modest share of the TPM budget. Longer texts keep their start and end.
+MAX_INPUT_CHARS = 120_000
+PDF_START_MARKER = "<<<PDF_START>>>"
+PDF_END_MARKER = "<<<PDF_END>>>"
+TRUNCATION_MARKER = "\n...[truncated]...\n"
+
+# Bound on items waiting between pipeline stages, so a fast stage cannot buffer a whole corpus in memory
+PIPELINE_QUEUE_SIZE = 32
+
+# Tokens-per-minute budget for async batch runs; set CLAUDE_TPM_LIMIT to the account's tier limit
+DEFAULT_TPM_LIMIT = 40_000
+
+# Retries for rate limits, overloads and connection errors; backoff is 1s, 2s, 4s, 8s unless Retry-After says otherwise
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 1.0
+
+# Prompt caching: blocks marked with CACHE_CONTROL (and everything before them) are served from cache for 5 minutes
+CACHE_CONTROL = {"type": "ephemeral"}
+PROMPT_CACHING_HEADERS = {"anthropic-beta": "prompt-caching-2024-07-31"}
+
+# Malformed or incomplete JSON replies are sent back to Claude with the problem, up to this many times
+MAX_FEEDBACK_RETRIES = 2
+INVALID_JSON_ERROR = "Invalid JSON in response"
+NOT_OBJECT_ERROR = "Response is not a JSON object"
+
+# Parallel GCS downloads in load_many_paper_json_files
+GCS_MAX_WORKERS = 16
+
+# Shared HTTP session for public JSON fetches so TCP/TLS connections are kept alive between calls
+HTTP_POOL_SIZE = 16
+HTTP_TIMEOUT = 30
+_http_session = requests.Session()
+_http_session.mount("https://", HTTPAdapter(
+    pool_connections=HTTP_POOL_SIZE,
+    pool_maxsize=HTTP_POOL_SIZE,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+# Prompts are built once at import time; only part3 has a dynamic portion (the current labels)
+_PART0_CITATION_PROMPT: Final[str] = """
+        Please analyze the provided paper information to extract citation details.
+        Return the data in the following JSON structure, maintaining strict adherence to the schema:
+        
+        {
+            "authors": ["List of authors in citation format"],
+            "year": "Publication year as string",
+            "title": "Full title of the work",
+            "type": "article/report/book/chapter",
+            "journal_name": "Full journal name",
+            "journal_volume": "Volume number as string",
+            "journal_issue": "Issue number as string",
+            "journal_pages": "Page range or total pages as string",
+            "org_name": "Publishing institution/organization",
+            "org_report_number": "Report ID/number",
+            "digital_doi": "Digital Object Identifier if available",
+            "digital_url": "Direct URL to publication",
+            "formatted_citation": "Complete formatted citation string"
+        }
+
+        Important instructions:
+        1. Extract all information exactly as presented in the source text
+        2. Use proper citation formatting for author names (Last, First M.)
+        3. Leave empty strings for missing information rather than omitting fields
+        4. Ensure all JSON fields are properly quoted and formatted
+        5. Verify URLs are complete and valid
+        6. Follow standard citation formatting guidelines
+        
+        Parse the provided information and return only the JSON object without any additional text or explanation.
+        """
+
+_PART1_PAPER_INFO_PROMPT: Final[str] = """
+        Please analyze the provided text in detail and extract ALL information about marine diatoms.
+        Pay special attention to extracting every single diatom species mentioned.
+        Return the data in the following JSON structure, maintaining strict adherence to the schema:
+
+        {
+            "figure_caption": "Plate 3: Marine Diatoms from the Azores",
+            "source_material_location": "South East coast of Faial, Caldeira Inferno",
+            "source_material_coordinates": "38° 31' N; 28° 38' W",
+            "source_material_description": "An open crater of a small volcano, shallow and sandy. Gathered from Pinna (molluscs) and stones.",
+            "source_material_date_collected": "June 1st, 1981",
+            "source_material_received_from": "Hans van den Heuvel, Leiden",
+            "source_material_date_received": "March 17th, 1988",
+            "source_material_note": "Material also deposited in Rijksherbarium Leiden, the Netherlands. Aliquot sample and slide also in collection Sterrenburg, Nr. 249.",
+            "paper_image_urls": ["Array of image URLs from the paper"],
+            "diatom_species_array": [
+                {
+                    "species_index": 65,
+                    "species_name": "Diploneis bombus",
+                    "species_authors": ["Cleve-Euler", "Backman"],
+                    "species_year": 1922,
+                    "species_references": [
+                        {
+                            "author": "Hendey",
+                            "year": 1964,
+                            "figure": "pl. 32, fig. 2"
+                        }
+                    ],
+                    "formatted_species_name": "Diploneis_bombus",
+                    "genus": "Diploneis",
+                    "species_magnification": "1000",
+                    "species_scale_bar_microns": "30",
+                    "species_note": ""
+                }
+            ]
+        }
+
+        CRITICAL INSTRUCTIONS:
+        1. Extract EVERY SINGLE diatom species mentioned in the text
+        2. Do not skip any species even if they seem similar or repeated
+        3. Include all species details including indices, names, authors, and references
+        4. Maintain proper formatting for scientific names
+        5. Process the entire text thoroughly to find all species mentions
+        6. Generate formatted_species_name by replacing spaces with underscores
+        7. Leave empty strings for missing information rather than omitting fields
+        8. Parse numbers as integers where appropriate (species_index, year, etc.)
+        9. Look for species information in figures, plates, descriptions, and footnotes
+
+        Review the text multiple times to ensure no species are missed. Parse the provided text and return only the JSON object without any additional text or explanation.
+        """
+
+_PART2_DIATOMS_DATA_PROMPT: Final[str] = """
+        Please analyze the provided paper information and image URLs to extract information about diatoms.
+        Return the data in the following JSON structure, maintaining strict adherence to the schema:
+
+        {
+            "diatoms_data": [
+                {
+                    "image_url": "URL from paper_image_urls",
+                    "image_width": "",
+                    "image_height": "",
+                    "info": [
+                        {
+                            "label": ["39 Amphora_obtusa_var_oceanica"],
+                            "index": 39,
+                            "species": "Amphora_obtusa_var_oceanica",
+                            "bbox": "",
+                            "yolo_bbox": "",
+                            "segmentation": "",
+                            "embeddings": ""
+                        }
+                    ]
+                }
+            ]
+        }
+
+        Important instructions:
+        1. Create a diatoms_data entry for each image URL in paper_image_urls
+        2. For each image, include ALL species from the diatom_species_array
+        3. Use species_index and formatted_species_name to create the label and species fields
+        4. Ensure image_url is properly set from paper_image_urls
+        5. Leave empty strings for missing information rather than omitting fields
+        6. Ensure all JSON fields are properly quoted and formatted
+
+        Parse the provided information and return only the JSON object without any additional text or explanation.
+        """
+
+_PART3_HEADER: Final[str] = """You are a JSON API that can only respond with valid JSON. Never include explanations or text outside the JSON structure.
+
+        TASK:
+        Analyze the provided PDF text content and identify species that are NOT in the current labels list.
+
+        CURRENT LABELS:
+        """
+
+_PART3_FOOTER: Final[str] = """
+
+        REQUIRED RESPONSE FORMAT:
+        Return ONLY a JSON object with this exact structure - no other text or explanation:
+        {
+            "species_data": [
+                {
+                    "label": ["<index> <formatted_species_name> eg 10 eg Lyrella_spectabilis"],
+                    "index": <number>,
+                    "species": "<formatted_species_name> eg Lyrella_spectabili",
+                    "bbox": "",
+                    "yolo_bbox": "",
+                    "segmentation": "",
+                    "embeddings": "",
+                    "full_species_info": {
+                        "species_index": <number>,
+                        "species_name": "<name> eg Lyrella spectabilis",
+                        "species_authors": ["<author1>", "<author2>"],
+                        "species_year": <year>,
+                        "species_references": [
+                            {
+                                "author": "<author>",
+                                "year": <year>,
+                                "figure": "<figure>"
+                            }
+                        ],
+                        "formatted_species_name": "<name_with_underscores> eg Lyrella_spectabilis",
+                        "genus": "<genus>",
+                        "species_magnification": "<magnification> eg 1000",
+                        "species_scale_bar_microns": "<scale> eg 10",
+                        "species_note": "<success/failure message>"
+                    }
+                }
+            ],
+            "labels_retrieved": ["<index> <formatted_species_name>","<index> <formatted_species_name>",...],
+            "message": "<success_or_failure_message>"
+        }
+
+        RULES:
+        1. Return ONLY valid JSON - no markdown, no explanation, no other text
+        2. Include ONLY species NOT present in current labels
+        3. Format species names with underscores instead of spaces
+        4. Include ALL fields in the structure, using empty strings for missing data
+        5. If no new species found, return empty arrays with appropriate message
+        6. Species index must match the index in the original text
+        7. Label format must be exactly: "<index> <formatted_species_name>"
+
+        YOUR RESPONSE MUST BE PURE JSON THAT CAN BE PARSED BY json.loads()"""
+
+
 class ClaudeAI:
     """
     A class to handle interactions with Claude AI API and manage paper data storage.
     """
+
+    # Bump whenever a partN_* prompt changes so cached responses are not reused
+    PROMPT_VERSION = "v1"
+
+    # Digest of the payload last loaded or uploaded, per JSON URL; shared so callers can seed it before
+    # the first ClaudeAI instance exists
+    _last_saved_digests: Dict[str, str] = {}
     
     def __init__(self):
         """Initialize the ClaudeAI instance with necessary credentials and configurations."""
         self.CLAUDE_API_KEY = os.getenv('CLAUDE_API_KEY')
         self.secret_json = os.getenv('GOOGLE_SECRET_JSON')
-        self.client = Anthropic(api_key=self.CLAUDE_API_KEY)
+        # Parsed secret and storage client are created on first use and then reused
+        self._sa_info: Optional[Dict[str, Any]] = None
+        self._storage_client: Optional[storage.Client] = None
+        self._storage_client_lock = threading.Lock()
+        # Retries are handled by get_completion so the SDK's own retries are disabled
+        self.client = Anthropic(api_key=self.CLAUDE_API_KEY, max_retries=0,
+                                default_headers=PROMPT_CACHING_HEADERS)
+        # Created per batch run so it is bound to the running event loop
+        self.async_client: Optional[AsyncAnthropic] = None
         self.MODEL_NAME = "claude-3-5-sonnet-20241022"
+        self.extraction_cache = ExtractionCache()
+        self.token_budget = TokenBudgetTracker(int(os.getenv('CLAUDE_TPM_LIMIT', DEFAULT_TPM_LIMIT)))
+
+    @staticmethod
+    def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+        """
+        Work out how long to wait before retrying a failed Claude request.
+
+        Args:
+            error (Exception): Exception raised by messages.create
+            attempt (int): Zero-based number of the attempt that failed
+
+        Returns:
+            Optional[float]: Seconds to wait, or None if the error should not be retried
+        """
+        if attempt >= MAX_RETRIES:
+            return None
+
+        if isinstance(error, APIStatusError):
+            if not isinstance(error, RateLimitError) and error.status_code < 500:
+                return None
+            retry_after = error.response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return max(float(retry_after), 0.0)
+                except ValueError:
+                    pass
+        elif not isinstance(error, APIConnectionError):
+            return None
+
+        return RETRY_BASE_DELAY * 2 ** attempt
+
+    def _cache_completion(self, cache_key: Optional[str], result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Store a successful completion in the extraction cache.
+
+        Args:
+            cache_key (str): Cache key for the request, or None when caching is disabled
+            result (dict): Parsed completion
+
+        Returns:
+            dict: The completion, unchanged
+        """
+        if cache_key and "error" not in result:
+            self.extraction_cache.set(cache_key, result, self.MODEL_NAME, self.PROMPT_VERSION)
+        return result
+
+    @staticmethod
+    def _estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+        """
+        Roughly estimate the input tokens of a request at 4 characters per token.
+
+        Args:
+            messages (list): Array of message objects
+
+        Returns:
+            int: Estimated input tokens
+        """
+        chars = 0
+        for message in messages:
+            content = message.get("content", "")
+            if isinstance(content, str):
+                chars += len(content)
+            else:
+                chars += sum(len(block.get("text", "")) for block in content)
+        return chars // 4
+
+    @staticmethod
+    def _parse_completion(response: Any) -> Dict[str, Any]:
+        """
+        Parse the JSON body of a Claude messages response.
+
+        Args:
+            response: Response returned by messages.create
+
+        Returns:
+            dict: Parsed JSON response, or a dict with an "error" key
+        """
+        try:
+            text = response.content[0].text.strip()
+            # Tolerate replies wrapped in a ```json fence
+            if text.startswith("```"):
+                text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+            result = json.loads(text)
+        except json.JSONDecodeError:
+            return {"error": INVALID_JSON_ERROR}
+        except (IndexError, AttributeError):
+            return {"error": "Unexpected response format"}
+
+        if not isinstance(result, dict):
+            return {"error": NOT_OBJECT_ERROR}
+        return result
+
+    @staticmethod
+    def _completion_problem(result: Dict[str, Any], required_keys: Tuple[str, ...]) -> Optional[str]:
+        """
+        Describe what is wrong with a parsed completion, if it is worth asking Claude to fix it.
+
+        Args:
+            result (dict): Output of _parse_completion
+            required_keys (tuple): Top-level keys the response must contain
+
+        Returns:
+            Optional[str]: Description of the problem, or None if the completion is usable
+        """
+        if result.get("error") in (INVALID_JSON_ERROR, NOT_OBJECT_ERROR):
+            return f"{result['error']}"
+        if "error" not in result:
+            missing = [key for key in required_keys if key not in result]
+            if missing:
+                return f"Response is missing required fields: {', '.join(missing)}"
+        return None
+
+    @staticmethod
+    def _messages_with_feedback(messages: List[Dict[str, Any]], response: Any, problem: str) -> List[Dict[str, Any]]:
+        """
+        Extend a conversation with Claude's rejected reply and a request to correct it.
+
+        Args:
+            messages (list): Messages sent in the failed request
+            response: Response returned by messages.create
+            problem (str): Description from _completion_problem
+
+        Returns:
+            list: New message array for the retry
+        """
+        try:
+            previous_reply = response.content[0].text
+        except (IndexError, AttributeError):
+            previous_reply = ""
+
+        return messages + [
+            {"role": "assistant", "content": previous_reply or "(empty response)"},
+            {"role": "user", "content": f"{problem}. Reply again with only the corrected JSON object and no other text."}
+        ]
 
-    def get_completion(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def get_completion(self, messages: List[Dict[str, Any]], use_cache: bool = True,
+                       required_keys: Tuple[str, ...] = ()) -> Dict[str, Any]:
         """
         Send a request to Claude API and return the completion.
 
         Args:
             messages (list): Array of message objects
+            use_cache (bool): Return a cached response for identical requests
+            required_keys (tuple): Top-level keys the response must contain
 
         Returns:
             dict: Parsed JSON response from Claude
         """
-        try:
-            response = self.client.messages.create(
-                model=self.MODEL_NAME,
-                max_tokens=8092,
-                messages=messages
-            )
+        cache_key = self.extraction_cache.make_key(self.MODEL_NAME, self.PROMPT_VERSION, messages) if use_cache else None
+        if cache_key:
+            cached = self.extraction_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        attempt = 0
+        feedback_attempts = 0
+        while True:
+            try:
+                response = self.client.messages.create(
+                    model=self.MODEL_NAME,
+                    max_tokens=8092,
+                    messages=messages
+                )
+                result = self._parse_completion(response)
+
+                problem = self._completion_problem(result, required_keys)
+                if problem and feedback_attempts < MAX_FEEDBACK_RETRIES:
+                    logger.warning("Asking Claude to correct its response: %s", problem)
+                    messages = self._messages_with_feedback(messages, response, problem)
+                    feedback_attempts += 1
+                    continue
+
+                if problem:
+                    # Keep a response that is still malformed out of the cache so a later run asks again
+                    logger.warning("Claude response still invalid after feedback: %s", problem)
+                    return result
+                return self._cache_completion(cache_key, result)
 
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    return {"error": str(e)}
+                logger.warning("Claude request failed (%s); retrying in %.1fs", e, delay)
+                time.sleep(delay)
+                attempt += 1
+
+    async def get_completion_async(self, messages: List[Dict[str, Any]],
+                                   sem: asyncio.Semaphore, use_cache: bool = True,
+                                   required_keys: Tuple[str, ...] = ()) -> Dict[str, Any]:
+        """
+        Send a request to Claude API without blocking the event loop.
+
+        Args:
+            messages (list): Array of message objects
+            sem (asyncio.Semaphore): Semaphore bounding concurrent requests
+            use_cache (bool): Return a cached response for identical requests
+            required_keys (tuple): Top-level keys the response must contain
+
+        Returns:
+            dict: Parsed JSON response from Claude
+        """
+        cache_key = self.extraction_cache.make_key(self.MODEL_NAME, self.PROMPT_VERSION, messages) if use_cache else None
+        if cache_key:
+            cached = self.extraction_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        if self.async_client is None:
+            self.async_client = AsyncAnthropic(api_key=self.CLAUDE_API_KEY, max_retries=0,
+                                               default_headers=PROMPT_CACHING_HEADERS)
+
+        attempt = 0
+        feedback_attempts = 0
+        while True:
             try:
-                return json.loads(response.content[0].text)
-            except json.JSONDecodeError:
-                return {"error": "Invalid JSON in response"}
-            except (IndexError, AttributeError):
-                return {"error": "Unexpected response format"}
+                async with sem:
+                    reservation = await self.token_budget.acquire(self._estimate_tokens(messages))
+                    response = await self.async_client.messages.create(
+                        model=self.MODEL_NAME,
+                        max_tokens=8092,
+                        messages=messages
+                    )
+                usage = getattr(response, "usage", None)
+                if usage is not None:
+                    self.token_budget.record_usage(usage.input_tokens + usage.output_tokens, reservation)
+                result = self._parse_completion(response)
+
+                problem = self._completion_problem(result, required_keys)
+                if problem and feedback_attempts < MAX_FEEDBACK_RETRIES:
+                    logger.warning("Asking Claude to correct its response: %s", problem)
+                    messages = self._messages_with_feedback(messages, response, problem)
+                    feedback_attempts += 1
+                    continue
+
+                if problem:
+                    # Keep a response that is still malformed out of the cache so a later run asks again
+                    logger.warning("Claude response still invalid after feedback: %s", problem)
+                    return result
+                return self._cache_completion(cache_key, result)
 
-        except Exception as e:
-            return {"error": str(e)}
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    return {"error": str(e)}
+                logger.warning("Claude request failed (%s); retrying in %.1fs", e, delay)
+                # Sleep outside the semaphore so other papers can use the slot
+                await asyncio.sleep(delay)
+                attempt += 1
 
     def process_paper(self, full_text: str, extracted_images_file_metadata: Dict) -> Tuple[Dict[str, Any], Dict[str, Any], List[str]]:
         """
@@ -74,24 +544,185 @@ class ClaudeAI:
         # Get paper info
         part1_prompt = self.part1_create_paper_info_json_from_pdf_text_content_prompt()
         part1_messages = self.part1_create_messages_for_paper_info_json(full_text, part1_prompt)
-        paper_info = self.get_completion(part1_messages)
-        
+        paper_info = self.get_completion(part1_messages, required_keys=("diatom_species_array",))
+
+        return self._build_paper_diatoms_data(paper_info, extracted_images_file_metadata)
+
+    async def process_paper_async(self, full_text: str, extracted_images_file_metadata: Dict,
+                                  sem: asyncio.Semaphore) -> Tuple[Dict[str, Any], Dict[str, Any], List[str]]:
+        """
+        Async variant of process_paper for use in batch runs.
+
+        Args:
+            full_text (str): The complete text content of the paper
+            extracted_images_file_metadata (Dict): Metadata containing extracted image information
+            sem (asyncio.Semaphore): Semaphore shared by all papers in the batch
+
+        Returns:
+            tuple: (paper_info, paper_diatoms_data, paper_image_urls)
+        """
+        part1_prompt = self.part1_create_paper_info_json_from_pdf_text_content_prompt()
+        part1_messages = self.part1_create_messages_for_paper_info_json(full_text, part1_prompt)
+        paper_info = await self.get_completion_async(part1_messages, sem, required_keys=("diatom_species_array",))
+
+        return self._build_paper_diatoms_data(paper_info, extracted_images_file_metadata)
+
+    async def process_papers_async(self, batch: List[Tuple[str, Dict]],
+                                   max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> List[Tuple[Dict[str, Any], Dict[str, Any], List[str]]]:
+        """
+        Process a batch of papers with up to max_concurrency Claude requests in flight.
+
+        Args:
+            batch (list): List of (full_text, extracted_images_file_metadata) tuples
+            max_concurrency (int): Maximum number of concurrent Claude requests
+
+        Returns:
+            list: process_paper results, in the same order as batch
+        """
+        sem = asyncio.Semaphore(max_concurrency)
+        try:
+            return await asyncio.gather(
+                *[self.process_paper_async(full_text, metadata, sem) for full_text, metadata in batch]
+            )
+        finally:
+            await self._close_async_client()
+
+    async def _close_async_client(self) -> None:
+        """Close the async client at the end of a batch run so it does not outlive its event loop."""
+        if self.async_client is not None:
+            await self.async_client.close()
+            self.async_client = None
+
+    async def process_pdfs_pipeline_async(self, pdf_urls: List[str],
+                                          load_pdf: Callable[[str], Tuple[str, Dict]],
+                                          save_result: Callable[[str, Tuple[Dict[str, Any], Dict[str, Any], List[str]]], Any],
+                                          max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                                          queue_size: int = PIPELINE_QUEUE_SIZE) -> Dict[str, Tuple[Dict[str, Any], Dict[str, Any], List[str]]]:
+        """
+        Run PDFs through a three-stage pipeline (load -> Claude extraction -> save) connected by
+        bounded queues, so PDF downloads and result saves overlap with Claude requests.
+
+        Args:
+            pdf_urls (list): URLs of the PDFs to process
+            load_pdf (callable): Blocking function returning (full_text, extracted_images_file_metadata)
+                for a PDF URL, e.g. built from PDFOps; run in a worker thread
+            save_result (callable): Blocking function called with (pdf_url, process_paper result);
+                run in a worker thread
+            max_concurrency (int): Maximum number of concurrent Claude requests
+            queue_size (int): Maximum number of items waiting between stages
+
+        Returns:
+            dict: process_paper results keyed by PDF URL, for the PDFs that loaded successfully
+        """
+        sem = asyncio.Semaphore(max_concurrency)
+        pdf_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        result_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        results = {}
+
+        async def producer():
+            for pdf_url in pdf_urls:
+                try:
+                    loaded = await asyncio.to_thread(load_pdf, pdf_url)
+                except Exception as e:
+                    logger.error("Error loading PDF %s: %s", pdf_url, e)
+                    continue
+                await pdf_queue.put((pdf_url, loaded))
+            # One sentinel per extractor
+            for _ in range(max_concurrency):
+                await pdf_queue.put(None)
+
+        async def extractor():
+            while (item := await pdf_queue.get()) is not None:
+                pdf_url, (full_text, metadata) = item
+                result = await self.process_paper_async(full_text, metadata, sem)
+                await result_queue.put((pdf_url, result))
+
+        async def extract_all():
+            await asyncio.gather(*[extractor() for _ in range(max_concurrency)])
+            await result_queue.put(None)
+
+        async def saver():
+            while (item := await result_queue.get()) is not None:
+                pdf_url, result = item
+                results[pdf_url] = result
+                try:
+                    await asyncio.to_thread(save_result, pdf_url, result)
+                except Exception as e:
+                    logger.error("Error saving result for %s: %s", pdf_url, e)
+
+        try:
+            await asyncio.gather(producer(), extract_all(), saver())
+        finally:
+            await self._close_async_client()
+
+        return results
+
+    def process_pdfs_pipeline(self, pdf_urls: List[str],
+                              load_pdf: Callable[[str], Tuple[str, Dict]],
+                              save_result: Callable[[str, Tuple[Dict[str, Any], Dict[str, Any], List[str]]], Any],
+                              max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                              queue_size: int = PIPELINE_QUEUE_SIZE) -> Dict[str, Tuple[Dict[str, Any], Dict[str, Any], List[str]]]:
+        """
+        Synchronous entry point for process_pdfs_pipeline_async.
+
+        Args:
+            pdf_urls (list): URLs of the PDFs to process
+            load_pdf (callable): Blocking function returning (full_text, extracted_images_file_metadata)
+            save_result (callable): Blocking function called with (pdf_url, process_paper result)
+            max_concurrency (int): Maximum number of concurrent Claude requests
+            queue_size (int): Maximum number of items waiting between stages
+
+        Returns:
+            dict: process_paper results keyed by PDF URL
+        """
+        return asyncio.run(self.process_pdfs_pipeline_async(
+            pdf_urls, load_pdf, save_result, max_concurrency, queue_size
+        ))
+
+    def process_papers(self, batch: List[Tuple[str, Dict]],
+                       max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> List[Tuple[Dict[str, Any], Dict[str, Any], List[str]]]:
+        """
+        Synchronous entry point for process_papers_async.
+
+        Args:
+            batch (list): List of (full_text, extracted_images_file_metadata) tuples
+            max_concurrency (int): Maximum number of concurrent Claude requests
+
+        Returns:
+            list: process_paper results, in the same order as batch
+        """
+        return asyncio.run(self.process_papers_async(batch, max_concurrency))
+
+    @staticmethod
+    def _build_paper_diatoms_data(paper_info: Dict[str, Any],
+                                  extracted_images_file_metadata: Dict) -> Tuple[Dict[str, Any], Dict[str, Any], List[str]]:
+        """
+        Build the diatoms data for a paper from Claude's paper info response.
+
+        Args:
+            paper_info (dict): Paper info returned by the part1 prompt
+            extracted_images_file_metadata (Dict): Metadata containing extracted image information
+
+        Returns:
+            tuple: (paper_info, paper_diatoms_data, paper_image_urls)
+        """
         if not paper_info or "error" in paper_info:
             logger.error("Failed to extract paper info")
             return {}, {}, []
             
-        # Get species array from paper info
-        species_array = paper_info.get("diatom_species_array", [])
-        
-        if not species_array:
-            logger.warning("No species found in paper info")
-        
         # Get image URLs from extracted_images_file_metadata
         paper_image_urls = extracted_images_file_metadata.get('paper_image_urls', [])
         if not paper_image_urls:
             logger.warning("No image URLs found in extracted_images_file_metadata")
+
+        # Get species array from paper info
+        species_array = paper_info.get("diatom_species_array", [])
+        
+        if not species_array:
+            logger.warning("No species found in paper info; no diatoms data was generated")
+            return paper_info, {}, paper_image_urls
                 
-        logger.info(f"Found {len(paper_image_urls)} images and {len(species_array)} species")
+        logger.info("Found %d images and %d species", len(paper_image_urls), len(species_array))
 
         # Set image_url to empty string if no URLs available
         try:
@@ -99,34 +730,37 @@ class ClaudeAI:
         except (IndexError, TypeError):
             image_url = ""
         
-        # Create info entries for all species
-        info_array = []
-        for species in species_array:
-            try:
-                info_entry = {
-                    "label": [f"{species['species_index']} {species['formatted_species_name']}"],
-                    "index": species['species_index'],
-                    "species": species['formatted_species_name'],
-                    "bbox": "",
-                    "yolo_bbox": "",
-                    "segmentation": "",
-                    "embeddings": ""
-                }
-                info_array.append(info_entry)
-            except KeyError as e:
-                logger.error(f"Missing required field in species data: {e}")
-                continue
-        
-        if info_array:  # Only create entry if we have species info
-            diatom_data = {
+        # Create info entries for all species that have the required fields
+        required = ("species_index", "formatted_species_name")
+        valid_species = [
+            species for species in species_array
+            if isinstance(species, dict) and all(key in species for key in required)
+        ]
+        if len(valid_species) != len(species_array):
+            logger.error("Dropped %d species missing required fields", len(species_array) - len(valid_species))
+
+        info_array = [
+            {
+                "label": [f"{species['species_index']} {species['formatted_species_name']}"],
+                "index": species['species_index'],
+                "species": species['formatted_species_name'],
+                "bbox": "",
+                "yolo_bbox": "",
+                "segmentation": "",
+                "embeddings": ""
+            }
+            for species in valid_species
+        ]
+
+        # Package the diatoms data, only if we have species info
+        paper_diatoms_data = {}
+        if info_array:
+            paper_diatoms_data = {
                 "image_url": image_url,
                 "image_width": "",
                 "image_height": "",
                 "info": info_array
             }
-        
-        # Package the diatoms data
-        paper_diatoms_data = diatom_data if 'diatom_data' in locals() else {}
 
         if not paper_diatoms_data:
             logger.warning("No diatoms data was generated")
@@ -135,12 +769,18 @@ class ClaudeAI:
 
     def get_storage_client(self):
         """
-        Get authenticated Google Cloud Storage client.
+        Get authenticated Google Cloud Storage client, shared by all calls on this instance.
 
         Returns:
             storage.Client: Authenticated GCS client
         """
-        return storage.Client.from_service_account_info(json.loads(self.secret_json))
+        if self._storage_client is None:
+            with self._storage_client_lock:
+                if self._storage_client is None:
+                    if self._sa_info is None:
+                        self._sa_info = orjson.loads(self.secret_json)
+                    self._storage_client = storage.Client.from_service_account_info(self._sa_info)
+        return self._storage_client
 
     def get_public_urls(self, bucket_name: str, session_id: str) -> List[str]:
         """
@@ -156,38 +796,70 @@ class ClaudeAI:
         try:
             client = self.get_storage_client()
             bucket = client.bucket(bucket_name)
-            blobs = bucket.list_blobs(prefix=f"pdf/{session_id}/")
+            # Only names are needed, so skip the rest of the object metadata in the listing
+            blobs = bucket.list_blobs(prefix=f"pdf/{session_id}/", fields="items(name),nextPageToken")
             return [f"https://storage.googleapis.com/{bucket_name}/{blob.name}" for blob in blobs]
         
         except Exception as e:
-            logger.error(f"Error retrieving public URLs: {e}")
+            logger.error("Error retrieving public URLs: %s", e)
             return []
 
 
-    def load_paper_json_files(self, papers_json_public_url: str) -> List[Dict[str, Any]]:
-            """
-            Load existing paper JSON files from GCS.
+    def load_paper_json_files(self, papers_json_public_url: str,
+                              storage_client: Optional[storage.Client] = None) -> List[Dict[str, Any]]:
+        """
+        Load existing paper JSON files from GCS.
 
-            Args:
-                papers_json_public_url (str): Public URL of the JSON files
+        Args:
+            papers_json_public_url (str): Public URL of the JSON files
+            storage_client (storage.Client, optional): Client to reuse instead of creating one
 
-            Returns:
-                list: List of paper JSON objects
-            """
-            try:
-                storage_client = self.get_storage_client()
-                bucket_name = papers_json_public_url.split('/')[3]
-                blob_path = '/'.join(papers_json_public_url.split('/')[4:])
+        Returns:
+            list: List of paper JSON objects
+        """
+        try:
+            storage_client = storage_client or self.get_storage_client()
+            bucket_name = papers_json_public_url.split('/')[3]
+            blob_path = '/'.join(papers_json_public_url.split('/')[4:])
 
-                bucket = storage_client.bucket(bucket_name)
-                blob = bucket.blob(blob_path)
+            bucket = storage_client.bucket(bucket_name)
+            blob = bucket.blob(blob_path)
 
-                if blob.exists():
-                    content = blob.download_as_string()
-                    return json.loads(content)
-            except Exception as e:
-                logger.error(f"Error loading paper JSON files: {str(e)}")
-            return []
+            # Download directly and treat a missing blob as empty, rather than paying for an exists() round trip
+            return orjson.loads(blob.download_as_bytes())
+        except NotFound:
+            logger.info("No paper JSON files found at %s", papers_json_public_url)
+        except Exception as e:
+            logger.error("Error loading paper JSON files: %s", e)
+        return []
+
+    def load_many_paper_json_files(self, papers_json_public_urls: List[str],
+                                   max_workers: int = GCS_MAX_WORKERS) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Load several paper JSON files from GCS in parallel over one shared client.
+
+        Args:
+            papers_json_public_urls (list): Public URLs of the JSON files
+            max_workers (int): Maximum number of concurrent downloads
+
+        Returns:
+            dict: Mapping of each URL to its list of paper JSON objects
+        """
+        if not papers_json_public_urls:
+            return {}
+
+        try:
+            storage_client = self.get_storage_client()
+        except Exception as e:
+            logger.error("Error creating storage client: %s", e)
+            return {url: [] for url in papers_json_public_urls}
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(papers_json_public_urls))) as executor:
+            results = executor.map(
+                lambda url: self.load_paper_json_files(url, storage_client),
+                papers_json_public_urls
+            )
+            return dict(zip(papers_json_public_urls, results))
 
     def save_paper_json_files(self, papers_json_public_url: str, 
                             paper_json_files: List[Dict[str, Any]]) -> str:
@@ -209,13 +881,15 @@ class ClaudeAI:
             bucket = storage_client.bucket(bucket_name)
             blob = bucket.blob(blob_path)
 
+            # Stored compact and gzip-encoded; GCS decompresses transparently for clients that don't accept gzip
+            blob.content_encoding = 'gzip'
             blob.upload_from_string(
-                json.dumps(paper_json_files, indent=2),
+                gzip.compress(orjson.dumps(paper_json_files), compresslevel=6),
                 content_type='application/json'
             )
             return papers_json_public_url
         except Exception as e:
-            logger.error(f"Error saving paper JSON files: {str(e)}")
+            logger.error("Error saving paper JSON files: %s", e)
             return ""
 
     @staticmethod
@@ -224,37 +898,7 @@ class ClaudeAI:
         Creates a structured prompt for Claude to process citation information.
         Returns a string containing the prompt with instructions and expected JSON structure.
         """
-        prompt = """
-        Please analyze the provided paper information to extract citation details.
-        Return the data in the following JSON structure, maintaining strict adherence to the schema:
-        
-        {
-            "authors": ["List of authors in citation format"],
-            "year": "Publication year as string",
-            "title": "Full title of the work",
-            "type": "article/report/book/chapter",
-            "journal_name": "Full journal name",
-            "journal_volume": "Volume number as string",
-            "journal_issue": "Issue number as string",
-            "journal_pages": "Page range or total pages as string",
-            "org_name": "Publishing institution/organization",
-            "org_report_number": "Report ID/number",
-            "digital_doi": "Digital Object Identifier if available",
-            "digital_url": "Direct URL to publication",
-            "formatted_citation": "Complete formatted citation string"
-        }
-
-        Important instructions:
-        1. Extract all information exactly as presented in the source text
-        2. Use proper citation formatting for author names (Last, First M.)
-        3. Leave empty strings for missing information rather than omitting fields
-        4. Ensure all JSON fields are properly quoted and formatted
-        5. Verify URLs are complete and valid
-        6. Follow standard citation formatting guidelines
-        
-        Parse the provided information and return only the JSON object without any additional text or explanation.
-        """
-        return prompt
+        return _PART0_CITATION_PROMPT
 
     @staticmethod
     def part1_create_paper_info_json_from_pdf_text_content_prompt() -> str:
@@ -264,57 +908,25 @@ class ClaudeAI:
         Returns:
             str: Prompt with instructions and expected JSON structure
         """
-        return """
-        Please analyze the provided text in detail and extract ALL information about marine diatoms.
-        Pay special attention to extracting every single diatom species mentioned.
-        Return the data in the following JSON structure, maintaining strict adherence to the schema:
-
-        {
-            "figure_caption": "Plate 3: Marine Diatoms from the Azores",
-            "source_material_location": "South East coast of Faial, Caldeira Inferno",
-            "source_material_coordinates": "38° 31' N; 28° 38' W",
-            "source_material_description": "An open crater of a small volcano, shallow and sandy. Gathered from Pinna (molluscs) and stones.",
-            "source_material_date_collected": "June 1st, 1981",
-            "source_material_received_from": "Hans van den Heuvel, Leiden",
-            "source_material_date_received": "March 17th, 1988",
-            "source_material_note": "Material also deposited in Rijksherbarium Leiden, the Netherlands. Aliquot sample and slide also in collection Sterrenburg, Nr. 249.",
-            "paper_image_urls": ["Array of image URLs from the paper"],
-            "diatom_species_array": [
-                {
-                    "species_index": 65,
-                    "species_name": "Diploneis bombus",
-                    "species_authors": ["Cleve-Euler", "Backman"],
-                    "species_year": 1922,
-                    "species_references": [
-                        {
-                            "author": "Hendey",
-                            "year": 1964,
-                            "figure": "pl. 32, fig. 2"
-                        }
-                    ],
-                    "formatted_species_name": "Diploneis_bombus",
-                    "genus": "Diploneis",
-                    "species_magnification": "1000",
-                    "species_scale_bar_microns": "30",
-                    "species_note": ""
-                }
-            ]
-        }
+        return _PART1_PAPER_INFO_PROMPT
 
-        CRITICAL INSTRUCTIONS:
-        1. Extract EVERY SINGLE diatom species mentioned in the text
-        2. Do not skip any species even if they seem similar or repeated
-        3. Include all species details including indices, names, authors, and references
-        4. Maintain proper formatting for scientific names
-        5. Process the entire text thoroughly to find all species mentions
-        6. Generate formatted_species_name by replacing spaces with underscores
-        7. Leave empty strings for missing information rather than omitting fields
-        8. Parse numbers as integers where appropriate (species_index, year, etc.)
-        9. Look for species information in figures, plates, descriptions, and footnotes
 
-        Review the text multiple times to ensure no species are missed. Parse the provided text and return only the JSON object without any additional text or explanation.
+    @staticmethod
+    def _prepare_pdf_text(pdf_text_content: str) -> str:
         """
+        Fit PDF text into the request budget and wrap it in explicit start/end markers.
+
+        Args:
+            pdf_text_content (str): The extracted text from the PDF
 
+        Returns:
+            str: Marked-up text, with the middle dropped if it exceeds MAX_INPUT_CHARS
+        """
+        if len(pdf_text_content) > MAX_INPUT_CHARS:
+            logger.warning("PDF text has %d characters; truncating to %d", len(pdf_text_content), MAX_INPUT_CHARS)
+            half = MAX_INPUT_CHARS // 2
+            pdf_text_content = pdf_text_content[:half] + TRUNCATION_MARKER + pdf_text_content[-half:]
+        return f"{PDF_START_MARKER}\n{pdf_text_content}\n{PDF_END_MARKER}"
 
     @staticmethod
     def part1_create_messages_for_paper_info_json(pdf_text_content: str, 
@@ -329,13 +941,16 @@ class ClaudeAI:
         Returns:
             list: Array of message objects for the API request
         """
+        # The paper text is the cached prefix: it is well over the minimum cacheable length, and
+        # feedback retries and part3 requests for the same paper start with the same block
         return [
             {
                 "role": "user",
                 "content": [
                     {
                         "type": "text",
-                        "text": pdf_text_content
+                        "text": ClaudeAI._prepare_pdf_text(pdf_text_content),
+                        "cache_control": CACHE_CONTROL
                     },
                     {
                         "type": "text",
@@ -353,41 +968,7 @@ class ClaudeAI:
         Returns:
             str: Prompt with instructions and expected JSON structure
         """
-        return """
-        Please analyze the provided paper information and image URLs to extract information about diatoms.
-        Return the data in the following JSON structure, maintaining strict adherence to the schema:
-
-        {
-            "diatoms_data": [
-                {
-                    "image_url": "URL from paper_image_urls",
-                    "image_width": "",
-                    "image_height": "",
-                    "info": [
-                        {
-                            "label": ["39 Amphora_obtusa_var_oceanica"],
-                            "index": 39,
-                            "species": "Amphora_obtusa_var_oceanica",
-                            "bbox": "",
-                            "yolo_bbox": "",
-                            "segmentation": "",
-                            "embeddings": ""
-                        }
-                    ]
-                }
-            ]
-        }
-
-        Important instructions:
-        1. Create a diatoms_data entry for each image URL in paper_image_urls
-        2. For each image, include ALL species from the diatom_species_array
-        3. Use species_index and formatted_species_name to create the label and species fields
-        4. Ensure image_url is properly set from paper_image_urls
-        5. Leave empty strings for missing information rather than omitting fields
-        6. Ensure all JSON fields are properly quoted and formatted
-
-        Parse the provided information and return only the JSON object without any additional text or explanation.
-        """
+        return _PART2_DIATOMS_DATA_PROMPT
 
     @staticmethod
     def part2_create_messages_for_diatoms_data_object_creation(
@@ -439,6 +1020,26 @@ class ClaudeAI:
 
 
 
+    @staticmethod
+    def _format_labels_for_prompt(labels: List[str]) -> str:
+        """
+        Deduplicate labels, sort them by species index and put one per line.
+
+        Args:
+            labels (list): Labels of the form "<index> <species name>"
+
+        Returns:
+            str: Newline-separated labels, or "(none)" if there are no labels
+        """
+        def sort_key(label: str) -> Tuple[int, int, str]:
+            index, _, _ = label.partition(" ")
+            if index.isdigit():
+                return 0, int(index), label
+            return 1, 0, label
+
+        unique_labels = sorted({str(label) for label in labels}, key=sort_key)
+        return "\n".join(unique_labels) or "(none)"
+
     @staticmethod
     def part3_create_missing_species_prompt_and_messages(pdf_text_content: str, labels: List[str]) -> List[Dict[str, Any]]:
         """
@@ -451,68 +1052,22 @@ class ClaudeAI:
         Returns:
             list: Array of message objects for the Claude API request
         """
-        prompt = f"""You are a JSON API that can only respond with valid JSON. Never include explanations or text outside the JSON structure.
-
-        TASK:
-        Analyze the provided PDF text content and identify species that are NOT in the current labels list.
-
-        CURRENT LABELS:
-        {json.dumps(labels)}
-
-        REQUIRED RESPONSE FORMAT:
-        Return ONLY a JSON object with this exact structure - no other text or explanation:
-        {{
-            "species_data": [
-                {{
-                    "label": ["<index> <formatted_species_name> eg 10 eg Lyrella_spectabilis"],
-                    "index": <number>,
-                    "species": "<formatted_species_name> eg Lyrella_spectabili",
-                    "bbox": "",
-                    "yolo_bbox": "",
-                    "segmentation": "",
-                    "embeddings": "",
-                    "full_species_info": {{
-                        "species_index": <number>,
-                        "species_name": "<name> eg Lyrella spectabilis",
-                        "species_authors": ["<author1>", "<author2>"],
-                        "species_year": <year>,
-                        "species_references": [
-                            {{
-                                "author": "<author>",
-                                "year": <year>,
-                                "figure": "<figure>"
-                            }}
-                        ],
-                        "formatted_species_name": "<name_with_underscores> eg Lyrella_spectabilis",
-                        "genus": "<genus>",
-                        "species_magnification": "<magnification> eg 1000",
-                        "species_scale_bar_microns": "<scale> eg 10",
-                        "species_note": "<success/failure message>"
-                    }}
-                }}
-            ],
-            "labels_retrieved": ["<index> <formatted_species_name>","<index> <formatted_species_name>",...],
-            "message": "<success_or_failure_message>"
-        }}
-
-        RULES:
-        1. Return ONLY valid JSON - no markdown, no explanation, no other text
-        2. Include ONLY species NOT present in current labels
-        3. Format species names with underscores instead of spaces
-        4. Include ALL fields in the structure, using empty strings for missing data
-        5. If no new species found, return empty arrays with appropriate message
-        6. Species index must match the index in the original text
-        7. Label format must be exactly: "<index> <formatted_species_name>"
-
-        YOUR RESPONSE MUST BE PURE JSON THAT CAN BE PARSED BY json.loads()"""
+        prompt = "".join([_PART3_HEADER, ClaudeAI._format_labels_for_prompt(labels), _PART3_FOOTER])
 
+        # The paper text is sent as its own cached block: the assistant is called once per image,
+        # so later images of the same paper reuse it and only the labels/prompt are new tokens
         messages = [
             {
                 "role": "user",
                 "content": [
                     {
                         "type": "text",
-                        "text": f"{pdf_text_content}\n\n{prompt}"
+                        "text": ClaudeAI._prepare_pdf_text(pdf_text_content),
+                        "cache_control": CACHE_CONTROL
+                    },
+                    {
+                        "type": "text",
+                        "text": prompt
                     }
                 ]
             }
@@ -582,12 +1137,40 @@ class ClaudeAI:
                 return citation_json
                 
             except Exception as e:
-                logger.error(f"Error during citation extraction: {str(e)}")
+                logger.error("Error during citation extraction: %s", e)
                 return ClaudeAI.get_default_citation()
                     
         else:
             raise ValueError("Invalid method. Use 'default_citation' or 'citation_from_llm'")
             
+    @staticmethod
+    def extract_diatoms_data(paper_json_files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Extract the diatoms_data objects from already loaded paper JSON files.
+
+        Args:
+            paper_json_files (list): List of paper JSON objects
+
+        Returns:
+            list: Array of diatoms data objects
+        """
+        diatoms_data_array = []
+        
+        for paper in paper_json_files:
+            diatoms_data = paper.get("diatoms_data")
+            
+            if diatoms_data:
+                if isinstance(diatoms_data, str):
+                    try:
+                        diatoms_data = orjson.loads(diatoms_data)
+                    except json.JSONDecodeError:
+                        logger.warning("Skipping invalid JSON in diatoms_data")
+                        continue
+                
+                diatoms_data_array.append(diatoms_data)
+        
+        return diatoms_data_array
+
     @staticmethod
     def get_DIATOMS_DATA(json_url: str) -> List[Dict[str, Any]]:
         """
@@ -599,40 +1182,42 @@ class ClaudeAI:
         Returns:
             list: Array of diatoms data objects
         """
-        diatoms_data_array = []
-        
         try:
-            response = requests.get(json_url)
+            response = _http_session.get(json_url, timeout=HTTP_TIMEOUT)
             response.raise_for_status()
-            paper_json_files = response.json()
+            paper_json_files = orjson.loads(response.content)
             
-            for paper in paper_json_files:
-                diatoms_data = paper.get("diatoms_data")
-                
-                if diatoms_data:
-                    if isinstance(diatoms_data, str):
-                        try:
-                            diatoms_data = json.loads(diatoms_data)
-                        except json.JSONDecodeError:
-                            logger.warning(f"Skipping invalid JSON in diatoms_data")
-                            continue
-                    
-                    diatoms_data_array.append(diatoms_data)
+            diatoms_data_array = ClaudeAI.extract_diatoms_data(paper_json_files)
             
-            logger.info(f"Successfully extracted diatoms data from {len(diatoms_data_array)} papers")
+            logger.info("Successfully extracted diatoms data from %d papers", len(diatoms_data_array))
             return diatoms_data_array
             
         except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching data from URL: {str(e)}")
+            logger.error("Error fetching data from URL: %s", e)
         except json.JSONDecodeError as e:
-            logger.error(f"Error parsing JSON data: {str(e)}")
+            logger.error("Error parsing JSON data: %s", e)
         except Exception as e:
-            logger.error(f"Unexpected error: {str(e)}")
+            logger.error("Unexpected error: %s", e)
         
         return []
 
     @staticmethod
-    def update_and_save_papers(json_url: str, paper_json_files: List[Dict[str, Any]], 
+    def _papers_digest(json_content: bytes) -> str:
+        return hashlib.blake2b(json_content, digest_size=16).hexdigest()
+
+    @classmethod
+    def record_saved_papers(cls, json_url: str, paper_json_files: List[Dict[str, Any]]) -> None:
+        """
+        Record papers JSON that is already stored at json_url, e.g. just after loading it,
+        so update_and_save_papers skips uploading it unchanged.
+
+        Args:
+            json_url (str): URL the papers JSON was loaded from
+            paper_json_files (list): List of paper JSON objects with decoded diatoms_data
+        """
+        cls._last_saved_digests[json_url] = cls._papers_digest(orjson.dumps(paper_json_files))
+
+    def update_and_save_papers(self, json_url: str, paper_json_files: List[Dict[str, Any]], 
                              diatoms_data: List[Dict[str, Any]]) -> bool:
         """
         Update papers JSON with modified diatoms_data and save back to GCS.
@@ -651,19 +1236,28 @@ class ClaudeAI:
             
             # Update paper_json_files with new diatoms data
             for paper in paper_json_files:
-                if isinstance(paper.get('diatoms_data'), str):
-                    paper['diatoms_data'] = json.loads(paper['diatoms_data'])
-                    
-                current_data = paper.get('diatoms_data', {})
-                image_url = current_data.get('image_url', '')
-                
-                if image_url in diatoms_data_map:
-                    paper['diatoms_data'] = diatoms_data_map[image_url]
+                current_data = paper.get('diatoms_data')
+                if isinstance(current_data, str):
+                    current_data = orjson.loads(current_data)
+                    paper['diatoms_data'] = current_data
+
+                image_url = (current_data or {}).get('image_url', '')
+                new_data = diatoms_data_map.get(image_url)
+                if new_data is not None and new_data is not current_data:
+                    paper['diatoms_data'] = new_data
+
+            # Compact output; /api/download pretty-prints on demand for humans
+            json_content = orjson.dumps(paper_json_files)
+
+            # Callers usually edit diatoms_data in place, so compare the serialized payload
+            # with the last upload rather than tracking which papers were replaced
+            digest = self._papers_digest(json_content)
+            if self._last_saved_digests.get(json_url) == digest:
+                logger.info("No changes to papers JSON; skipping upload to: %s", json_url)
+                return True
             
             # Save updated data to GCS
-            storage_client = storage.Client.from_service_account_info(
-                json.loads(os.getenv('GOOGLE_SECRET_JSON'))
-            )
+            storage_client = self.get_storage_client()
             
             bucket_name = json_url.split('/')[3]
             blob_path = '/'.join(json_url.split('/')[4:])
@@ -671,15 +1265,19 @@ class ClaudeAI:
             bucket = storage_client.bucket(bucket_name)
             blob = bucket.blob(blob_path)
             
-            # Save with proper formatting
-            json_content = json.dumps(paper_json_files, indent=2)
-            blob.upload_from_string(json_content, content_type='application/json')
+            # Save gzip-encoded to cut upload and download bytes
+            blob.content_encoding = 'gzip'
+            blob.upload_from_string(
+                gzip.compress(json_content, compresslevel=6),
+                content_type='application/json'
+            )
             
-            logger.info(f"Successfully updated and saved papers JSON to: {json_url}")
+            self._last_saved_digests[json_url] = digest
+            logger.info("Successfully updated and saved papers JSON to: %s", json_url)
             return True
             
         except Exception as e:
-            logger.error(f"Error updating and saving papers: {str(e)}")
+            logger.error("Error updating and saving papers: %s", e)
             return False
     
     
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class ExtractionCache:
+    """
+    Content-addressable on-disk cache of Claude responses, one JSON file per request.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Args:
+            cache_dir: Directory for cache files. Defaults to EXTRACTION_CACHE_DIR or a
+                directory under the system temp dir
+        """
+        self.cache_dir = cache_dir or os.getenv('EXTRACTION_CACHE_DIR') or os.path.join(
+            tempfile.gettempdir(), 'claude_extraction_cache'
+        )
+
+    @staticmethod
+    def make_key(model: str, prompt_version: str, messages: List[Dict[str, Any]]) -> str:
+        """
+        Build the cache key for a request.
+
+        Args:
+            model: Model name the request is sent to
+            prompt_version: Version of the prompts used to build the messages
+            messages: Array of message objects
+
+        Returns:
+            str: Hex sha256 digest identifying the request
+        """
+        h = hashlib.sha256()
+        for part in (model.encode('utf-8'), prompt_version.encode('utf-8')):
+            h.update(len(part).to_bytes(8, 'big'))
+            h.update(part)
+        for message in messages:
+            # Length-prefix every message so content cannot shift between blocks
+            encoded = json.dumps(message, sort_keys=True).encode('utf-8')
+            h.update(len(encoded).to_bytes(8, 'big'))
+            h.update(encoded)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            Optional[Dict[str, Any]]: Cached response, or None on a miss
+        """
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)['result']
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading extraction cache entry {key}: {str(e)}")
+            return None
+
+    def set(self, key: str, value: Dict[str, Any], model: str = "", prompt_version: str = "") -> None:
+        """
+        Store a response in the cache.
+
+        Args:
+            key: Cache key from make_key
+            value: Parsed response to store
+            model: Model name, stored for reference
+            prompt_version: Prompt version, stored for reference
+        """
+        entry = {
+            'result': value,
+            'model': model,
+            'prompt_version': prompt_version,
+            'utc_ts': datetime.now(timezone.utc).isoformat()
+        }
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except Exception as e:
+            logger.error(f"Error writing extraction cache entry {key}: {str(e)}")
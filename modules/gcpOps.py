@@ -1,12 +1,25 @@
 import os
+import re
+import gzip
+import io
 import json
 import logging
+import mimetypes
+import tempfile
+import orjson
 from google.cloud import storage
+from google.api_core.exceptions import NotFound
+from google.auth.transport.requests import AuthorizedSession
+from google.oauth2 import service_account
 from dotenv import load_dotenv
 import pandas as pd
 import requests
-from typing import List, Dict, Any, Optional, Union
-import tempfile
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Optional, Tuple, Union
+import threading
+import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(
@@ -15,6 +28,68 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Number of keep-alive connections the storage client may hold open to GCS
+GCS_HTTP_POOL_SIZE = 32
+
+# Maximum number of deletions sent in one batch request (the API accepts up to 100)
+GCS_BATCH_SIZE = 100
+
+# PDFs larger than this are uploaded as parallel shards and composed server-side
+PARALLEL_UPLOAD_THRESHOLD = 50 * 1024 * 1024
+PARALLEL_UPLOAD_SHARD_SIZE = 32 * 1024 * 1024
+PARALLEL_UPLOAD_MAX_WORKERS = 8
+# compose() accepts at most 32 source objects
+GCS_MAX_COMPOSE_SOURCES = 32
+
+# Upload subfolder for each file extension; anything else is treated as a PDF
+_EXT_TO_SUBDIR = {
+    '.docx': 'word',
+    '.jpg': 'images',
+    '.jpeg': 'images',
+    '.png': 'images',
+    '.gif': 'images',
+    '.csv': 'csv',
+    '.txt': 'text',
+    '.text': 'text',
+}
+
+# Concurrent uploads used by save_files_to_bucket
+UPLOAD_MAX_WORKERS = 16
+
+# Concurrent HEAD requests used by check_gcs_files_exist
+HEAD_CHECK_MAX_WORKERS = 16
+
+# Partial-response fields for listings that only need name, size and timestamp
+LIST_FIELDS = "items(name,size,updated),nextPageToken"
+
+# Seconds a cached listing is reused before list_blobs is called again
+LIST_CACHE_TTL = 30.0
+
+# Public object URL: scheme://host/<bucket>/<blob path>
+_GCS_URL_RE = re.compile(r"^https?://[^/]+/([^/]+)/(.+)$")
+
+# Shared session so repeated HEAD checks reuse their TLS connections
+_HEAD_SESSION = requests.Session()
+_HEAD_SESSION.mount('https://', HTTPAdapter(pool_connections=GCS_HTTP_POOL_SIZE,
+                                            pool_maxsize=GCS_HTTP_POOL_SIZE, max_retries=1))
+
+@lru_cache(maxsize=256)
+def _parse_gcs_url(url: str) -> Tuple[str, str]:
+    """
+    Split a public GCS URL into (bucket_name, blob_path).
+    """
+    match = _GCS_URL_RE.match(url)
+    if match is None:
+        raise ValueError(f"Not a GCS object URL: {url}")
+    return match.group(1), match.group(2)
+
+@lru_cache(maxsize=None)
+def _get_storage_client(secret_json: str) -> storage.Client:
+    """
+    Return the storage client for a service account, built once per process and shared by all GCPOps instances.
+    """
+    return GCPOps._create_storage_client(json.loads(secret_json))
+
 class GCPOps:
     def __init__(self):
         # Load environment variables from .env file
@@ -23,75 +98,129 @@ class GCPOps:
         # Get the Google service account JSON from environment variable
         self.secret_json = os.getenv('GOOGLE_SECRET_JSON')
         try:
-            self.storage_client = storage.Client.from_service_account_info(
-                json.loads(self.secret_json)
-            )
+            self.storage_client = _get_storage_client(self.secret_json)
         except Exception as e:
             logger.error(f"Failed to initialize GCP storage client: {str(e)}")
             raise
 
+        # (bucket, prefix) -> (timestamp, blobs) for recent listings
+        self._list_cache: Dict[tuple, tuple] = {}
+        self._list_cache_lock = threading.Lock()
+        # Bumped on every invalidation so a listing that raced with an upload is not cached
+        self._list_cache_generation = 0
+
+    @staticmethod
+    def _create_storage_client(service_account_info: Dict[str, Any]) -> storage.Client:
+        """
+        Build a storage client whose HTTP session keeps a pool of connections alive between calls.
+        """
+        credentials = service_account.Credentials.from_service_account_info(
+            service_account_info,
+            scopes=storage.Client.SCOPE
+        )
+        http = AuthorizedSession(credentials)
+        adapter = HTTPAdapter(pool_connections=GCS_HTTP_POOL_SIZE, pool_maxsize=GCS_HTTP_POOL_SIZE)
+        http.mount('https://', adapter)
+        
+        return storage.Client(
+            project=service_account_info.get('project_id'),
+            credentials=credentials,
+            _http=http
+        )
+
     def save_file_to_bucket(self, artifact_url: str, session_id: str, bucket_name: str, 
-                          subdir: str = "papers", 
-                          subsubdirs: List[str] = ["pdf","word","images","csv","text"]) -> Optional[str]:
+                          subdir: str = "papers") -> Optional[str]:
         """
         Save a file to a GCP bucket with appropriate subdirectory structure.
         """
         try:
             # Determine the subsubdir based on the file extension
-            if artifact_url.endswith(".docx"):
-                subsubdir = "word"
-            elif artifact_url.endswith((".jpg", ".jpeg", ".png", ".gif")):
-                subsubdir = "images"
-            elif artifact_url.endswith(".csv"):
-                subsubdir = "csv"
-            elif artifact_url.endswith((".txt", ".text")):
-                subsubdir = "text"
-            else:
-                subsubdir = "pdf"  # Default to PDF if no other match
+            subsubdir = _EXT_TO_SUBDIR.get(os.path.splitext(artifact_url)[1].lower(), "pdf")
 
             bucket = self.storage_client.bucket(bucket_name)
 
             if subsubdir == "word":
                 # Delete the contents of the subsubdir before uploading the new file
                 blob_prefix = f"{session_id}/{subdir}/{subsubdir}/"
-                blobs = self.storage_client.list_blobs(bucket, prefix=blob_prefix)
-                for blob in blobs:
-                    blob.delete()
+                blobs = list(self.storage_client.list_blobs(
+                    bucket, prefix=blob_prefix, fields="items(name),nextPageToken"
+                ))
+                # Send the deletions as batch requests rather than one round trip per blob
+                for start in range(0, len(blobs), GCS_BATCH_SIZE):
+                    with self.storage_client.batch():
+                        for blob in blobs[start:start + GCS_BATCH_SIZE]:
+                            blob.delete()
 
             # Upload the file to Google Cloud Storage
             blob_name = f"{session_id}/{subdir}/{subsubdir}/{os.path.basename(artifact_url)}"
-            blob = bucket.blob(blob_name)
-            blob.upload_from_filename(artifact_url)
+            if os.path.getsize(artifact_url) > PARALLEL_UPLOAD_THRESHOLD:
+                # Match the content type upload_from_filename would have guessed for the small-file path
+                content_type = mimetypes.guess_type(artifact_url)[0] or 'application/octet-stream'
+                blob = self._parallel_composite_upload(bucket, blob_name, artifact_url, content_type)
+            else:
+                blob = bucket.blob(blob_name)
+                blob.upload_from_filename(artifact_url)
+            self.invalidate_prefix(bucket_name, f"{session_id}/{subdir}/{subsubdir}/")
             return blob.public_url
             
         except Exception as e:
             logger.error(f"Error saving file to bucket: {str(e)}")
             return None
 
+    def save_files_to_bucket(self, artifact_urls: List[str], session_id: str, bucket_name: str,
+                             subdir: str = "papers") -> List[Optional[str]]:
+        """
+        Save several files to a GCP bucket concurrently.
+
+        Args:
+            artifact_urls: Local paths of the files to upload
+            session_id: Session the files belong to
+            bucket_name: Destination bucket
+            subdir: Subdirectory under the session, as in save_file_to_bucket
+
+        Returns:
+            List[Optional[str]]: Public URL of each file in input order, or None where the upload failed
+        """
+        if not artifact_urls:
+            return []
+
+        def upload(url: str) -> Optional[str]:
+            return self.save_file_to_bucket(url, session_id, bucket_name, subdir)
+
+        # Word uploads clear their folder first, so they run in order in a single task
+        def is_word(url: str) -> bool:
+            return _EXT_TO_SUBDIR.get(os.path.splitext(url)[1].lower()) == "word"
+
+        word_urls = [url for url in artifact_urls if is_word(url)]
+
+        def upload_word_files() -> Dict[str, Optional[str]]:
+            return {url: upload(url) for url in word_urls}
+
+        with ThreadPoolExecutor(max_workers=min(UPLOAD_MAX_WORKERS, len(artifact_urls))) as executor:
+            word_future = executor.submit(upload_word_files) if word_urls else None
+            futures = {url: executor.submit(upload, url) for url in artifact_urls if not is_word(url)}
+            results = {url: future.result() for url, future in futures.items()}
+            if word_future is not None:
+                results.update(word_future.result())
+
+        return [results[url] for url in artifact_urls]
+
     def save_tracker_csv(self, df: pd.DataFrame, session_id: str, bucket_name: str) -> Optional[str]:
         """
         Save a pandas DataFrame as a CSV to the specified GCS bucket.
         """
         try:
-            # Create a temporary local CSV file
-            temp_csv_path = os.path.join('static', 'tmp', f'{session_id}.csv')
-            os.makedirs(os.path.dirname(temp_csv_path), exist_ok=True)
-            
-            # Save DataFrame to temporary CSV
-            df.to_csv(temp_csv_path, index=False)
-            
-            try:
-                # Use save_file_to_bucket to upload the CSV
-                url = self.save_file_to_bucket(
-                    artifact_url=temp_csv_path,
-                    session_id=session_id,
-                    bucket_name=bucket_name
-                )
-                return url
-            finally:
-                # Clean up temporary file
-                if os.path.exists(temp_csv_path):
-                    os.remove(temp_csv_path)
+            # Serialize in memory and upload directly instead of going through a temporary file
+            # gzip-encoded so downloads of the tracker transfer compressed bytes
+            buffer = io.BytesIO(gzip.compress(df.to_csv(index=False).encode('utf-8'), compresslevel=6))
+            size = len(buffer.getbuffer())
+            
+            # Same location save_file_to_bucket uses for CSVs
+            blob = self.storage_client.bucket(bucket_name).blob(f"{session_id}/papers/csv/{session_id}.csv")
+            blob.content_encoding = 'gzip'
+            # A known size lets the client use a single-request upload
+            blob.upload_from_file(buffer, size=size, content_type='text/csv')
+            return blob.public_url
             
         except Exception as e:
             logger.error(f"Error saving tracker CSV: {str(e)}")
@@ -102,11 +231,9 @@ class GCPOps:
         Initialize a pandas DataFrame from a CSV file stored in GCS.
         """
         try:
-            # Construct the GCS URL
-            gcs_url = f"https://storage.googleapis.com/{bucket_name}/{session_id}/papers/csv/{session_id}.csv"
-            
-            # Read directly from URL
-            df = pd.read_csv(gcs_url)
+            # Download through the pooled storage client; gzip-encoded trackers are decompressed locally
+            blob = self.storage_client.bucket(bucket_name).blob(f"{session_id}/papers/csv/{session_id}.csv")
+            df = pd.read_csv(io.BytesIO(blob.download_as_bytes()))
             logger.info(f"Successfully loaded tracker DataFrame with {len(df)} rows")
             return df
             
@@ -127,13 +254,44 @@ class GCPOps:
                 'processed',
             ])
 
+    def _list_blobs_cached(self, bucket_name: str, prefix: str) -> List[storage.Blob]:
+        """
+        List blobs under a prefix, reusing the result for LIST_CACHE_TTL seconds.
+        """
+        key = (bucket_name, prefix)
+        with self._list_cache_lock:
+            entry = self._list_cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] < LIST_CACHE_TTL:
+                return entry[1]
+            generation = self._list_cache_generation
+
+        blobs = list(self.storage_client.list_blobs(bucket_name, prefix=prefix, fields=LIST_FIELDS))
+
+        with self._list_cache_lock:
+            if generation == self._list_cache_generation:
+                self._list_cache[key] = (time.monotonic(), blobs)
+        return blobs
+
+    def invalidate_prefix(self, bucket_name: str, prefix: str) -> None:
+        """
+        Drop cached listings that could include objects under prefix.
+
+        Args:
+            bucket_name: Bucket that was written to
+            prefix: Blob name or folder prefix that changed
+        """
+        with self._list_cache_lock:
+            self._list_cache_generation += 1
+            for key in [key for key in self._list_cache
+                        if key[0] == bucket_name and (prefix.startswith(key[1]) or key[1].startswith(prefix))]:
+                del self._list_cache[key]
+
     def get_public_urls(self, bucket_name: str, session_id: str, file_hash_num: str) -> List[str]:
         """
         Get public URLs for all files in a specific bucket path.
         """
         try:
-            bucket = self.storage_client.bucket(bucket_name)
-            blobs = bucket.list_blobs(prefix=f"{session_id}/{file_hash_num}/")
+            blobs = self._list_blobs_cached(bucket_name, f"{session_id}/{file_hash_num}/")
             return [f"https://storage.googleapis.com/{bucket_name}/{blob.name}" for blob in blobs]
         except Exception as e:
             logger.error(f"Error getting public URLs: {str(e)}")
@@ -145,8 +303,7 @@ class GCPOps:
         Get public URLs and metadata for all files in a specific bucket path.
         """
         try:
-            bucket = self.storage_client.bucket(bucket_name)
-            blobs = bucket.list_blobs(prefix=f"{session_id}/{file_hash_num}/")
+            blobs = self._list_blobs_cached(bucket_name, f"{session_id}/{file_hash_num}/")
             
             files = []
             for blob in blobs:
@@ -170,37 +327,103 @@ class GCPOps:
         Load existing paper JSON files from GCS with enhanced error handling and validation.
         """
         try:
-            bucket_name = papers_json_public_url.split('/')[3]
-            blob_path = '/'.join(papers_json_public_url.split('/')[4:])
+            bucket_name, blob_path = _parse_gcs_url(papers_json_public_url)
             
             bucket = self.storage_client.bucket(bucket_name)
             blob = bucket.blob(blob_path)
             
-            if blob.exists():
-                content = blob.download_as_string()
-                data = json.loads(content)
-                
-                # Validate and process each paper's data
-                processed_data = []
-                for paper in data:
-                    if isinstance(paper.get('diatoms_data'), str):
-                        try:
-                            paper['diatoms_data'] = json.loads(paper['diatoms_data'])
-                        except json.JSONDecodeError:
-                            logger.warning(f"Skipping paper with invalid diatoms_data JSON")
-                            continue
-                    processed_data.append(paper)
-                
-                logger.info(f"Successfully loaded {len(processed_data)} papers from GCS")
-                return processed_data
-            else:
-                logger.warning(f"No file found at {papers_json_public_url}")
-                return []
+            # Download directly and treat a 404 as missing, rather than paying for an exists() round trip
+            content = blob.download_as_bytes()
+            processed_data = self._process_paper_json_content(content)
+            logger.info(f"Successfully loaded {len(processed_data)} papers from GCS")
+            return processed_data
                 
+        except NotFound:
+            logger.warning(f"No file found at {papers_json_public_url}")
+            return []
         except Exception as e:
             logger.error(f"Error loading paper JSON files: {str(e)}")
             return []
 
+    def load_paper_json_files_cached(self, papers_json_public_url: str, cache_path: str,
+                                     force_refresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        Load paper JSON files, reusing a local copy at cache_path while the GCS object's ETag is unchanged.
+        """
+        etag_path = f"{cache_path}.etag"
+        try:
+            bucket_name, blob_path = _parse_gcs_url(papers_json_public_url)
+            
+            bucket = self.storage_client.bucket(bucket_name)
+            blob = bucket.blob(blob_path)
+            
+            # Metadata-only request to get the current ETag
+            blob.reload()
+            
+            if not force_refresh and os.path.exists(cache_path) and os.path.exists(etag_path):
+                with open(etag_path, 'r') as f:
+                    cached_etag = f.read().strip()
+                
+                if cached_etag == blob.etag:
+                    with open(cache_path, 'rb') as f:
+                        content = f.read()
+                    processed_data = self._process_paper_json_content(content)
+                    logger.info(f"Loaded {len(processed_data)} papers from local cache {cache_path}")
+                    return processed_data
+            
+            content = blob.download_as_bytes()
+            
+            # Write to a unique temporary file first so a crash or a concurrent load never leaves a partial cache
+            cache_dir = os.path.dirname(cache_path) or '.'
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, cache_path)
+            except Exception:
+                os.remove(tmp_path)
+                raise
+            with open(etag_path, 'w') as f:
+                f.write(blob.etag or '')
+            
+            processed_data = self._process_paper_json_content(content)
+            logger.info(f"Successfully loaded {len(processed_data)} papers from GCS")
+            return processed_data
+            
+        except NotFound:
+            logger.warning(f"No file found at {papers_json_public_url}")
+            return []
+        except Exception as e:
+            logger.error(f"Error loading cached paper JSON files: {str(e)}")
+            # Serve the last downloaded copy when GCS or the network is unavailable
+            if os.path.exists(cache_path):
+                try:
+                    with open(cache_path, 'rb') as f:
+                        processed_data = self._process_paper_json_content(f.read())
+                    logger.warning(f"Loaded {len(processed_data)} papers from possibly stale local cache {cache_path}")
+                    return processed_data
+                except Exception as cache_error:
+                    logger.error(f"Error reading local cache {cache_path}: {str(cache_error)}")
+            return []
+
+    @staticmethod
+    def _process_paper_json_content(content: bytes) -> List[Dict[str, Any]]:
+        """
+        Parse downloaded papers JSON and decode any string diatoms_data, skipping invalid entries.
+        """
+        processed_data = []
+        # orjson parses the downloaded bytes directly, without decoding to str first
+        for paper in orjson.loads(content):
+            if isinstance(paper.get('diatoms_data'), str):
+                try:
+                    paper['diatoms_data'] = orjson.loads(paper['diatoms_data'])
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping paper with invalid diatoms_data JSON")
+                    continue
+            processed_data.append(paper)
+        return processed_data
+
     def save_paper_json_files(self, papers_json_public_url: str, 
                             paper_json_files: List[Dict[str, Any]]) -> str:
         """
@@ -213,22 +436,22 @@ class GCPOps:
                 # Ensure diatoms_data is properly formatted
                 if isinstance(paper.get('diatoms_data'), str):
                     try:
-                        paper['diatoms_data'] = json.loads(paper['diatoms_data'])
+                        paper['diatoms_data'] = orjson.loads(paper['diatoms_data'])
                     except json.JSONDecodeError:
                         logger.warning(f"Skipping paper with invalid diatoms_data JSON")
                         continue
                 processed_files.append(paper)
             
-            bucket_name = papers_json_public_url.split('/')[3]
-            blob_path = '/'.join(papers_json_public_url.split('/')[4:])
+            bucket_name, blob_path = _parse_gcs_url(papers_json_public_url)
             
             bucket = self.storage_client.bucket(bucket_name)
             blob = bucket.blob(blob_path)
             
-            # Save with proper formatting and content type
-            json_content = json.dumps(processed_files, indent=2)
+            # Save compact with the JSON content type, gzip-encoded to cut transfer size
+            json_content = orjson.dumps(processed_files)
+            blob.content_encoding = 'gzip'
             blob.upload_from_string(
-                json_content,
+                gzip.compress(json_content, compresslevel=6),
                 content_type='application/json'
             )
             
@@ -239,21 +462,34 @@ class GCPOps:
             logger.error(f"Error saving paper JSON files: {str(e)}")
             return ""
 
-    def save_json_to_bucket(self, local_file_path: str, bucket_name: str, 
-                          session_id: str) -> Optional[str]:
+    def save_json_to_bucket(self, local_file_path: Optional[str], bucket_name: str, 
+                          session_id: str, data: Union[Dict[str, Any], List[Any], None] = None) -> Optional[str]:
         """
-        Save a local JSON file to a GCP bucket with validation.
+        Save a local JSON file, or JSON data already in memory, to a GCP bucket with validation.
+
+        Args:
+            local_file_path: Path of a local JSON file; ignored when data is given
+            bucket_name: Destination bucket
+            session_id: Session the labels belong to
+            data: Already-parsed JSON data to upload without going through a file
+
+        Returns:
+            Optional[str]: Public URL of the uploaded file, or None on failure
         """
         try:
-            # Validate input JSON
-            with open(local_file_path, 'r') as f:
-                data = json.load(f)  # This will raise JSONDecodeError if invalid
+            if data is not None:
+                content = orjson.dumps(data)
+            else:
+                # Validate input JSON; the file is read once and the same bytes are uploaded
+                with open(local_file_path, 'rb') as f:
+                    content = f.read()
+                orjson.loads(content)  # This will raise JSONDecodeError if invalid
             
             bucket = self.storage_client.bucket(bucket_name)
             blob_name = f"labels/{session_id}/{session_id}.json"
             blob = bucket.blob(blob_name)
 
-            blob.upload_from_filename(local_file_path)
+            blob.upload_from_string(content, content_type='application/json')
             public_url = f"https://storage.googleapis.com/{bucket_name}/{blob_name}"
             
             logger.info(f"Successfully saved JSON to {public_url}")
@@ -272,12 +508,28 @@ class GCPOps:
         Check if a file exists in Google Cloud Storage using the public URL.
         """
         try:
-            response = requests.head(url, timeout=10)
+            response = _HEAD_SESSION.head(url, timeout=10)
             return response.status_code == 200
         except requests.exceptions.RequestException as e:
             logger.error(f"Error checking file existence: {str(e)}")
             return False
 
+    @staticmethod
+    def check_gcs_files_exist(urls: List[str]) -> Dict[str, bool]:
+        """
+        Check many public URLs concurrently.
+
+        Args:
+            urls: Public URLs to check
+
+        Returns:
+            Dict[str, bool]: Existence of each URL
+        """
+        if not urls:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(HEAD_CHECK_MAX_WORKERS, len(urls))) as executor:
+            return dict(zip(urls, executor.map(GCPOps.check_gcs_file_exists, urls)))
+
     def validate_and_process_paper_json(self, paper_json: Dict[str, Any]) -> Dict[str, Any]:
         """
         Validate and process a paper JSON object to ensure proper format.
@@ -285,7 +537,7 @@ class GCPOps:
         try:
             # Ensure diatoms_data is a dictionary
             if isinstance(paper_json.get('diatoms_data'), str):
-                paper_json['diatoms_data'] = json.loads(paper_json['diatoms_data'])
+                paper_json['diatoms_data'] = orjson.loads(paper_json['diatoms_data'])
             
             # Ensure required fields exist
             required_fields = ['image_url', 'info']
@@ -317,17 +569,19 @@ class GCPOps:
             # Load existing files
             paper_json_files = self.load_paper_json_files(papers_json_public_url)
             
-            # Update the specific paper's data
+            # Index papers by image_url; load_paper_json_files has already decoded diatoms_data
+            papers_by_image_url = {}
             for paper in paper_json_files:
-                if isinstance(paper.get('diatoms_data'), str):
-                    paper['diatoms_data'] = json.loads(paper['diatoms_data'])
-                
-                current_data = paper.get('diatoms_data', {})
-                if current_data.get('image_url') == updated_data.get('image_url'):
-                    paper['diatoms_data'] = self.validate_and_process_paper_json({
-                        'diatoms_data': updated_data
-                    })['diatoms_data']
-                    break
+                current_data = paper.get('diatoms_data')
+                if isinstance(current_data, dict):
+                    papers_by_image_url.setdefault(current_data.get('image_url'), paper)
+            
+            # Update the specific paper's data
+            paper = papers_by_image_url.get(updated_data.get('image_url'))
+            if paper is not None:
+                paper['diatoms_data'] = self.validate_and_process_paper_json({
+                    'diatoms_data': updated_data
+                })['diatoms_data']
             
             # Save updated files
             result_url = self.save_paper_json_files(papers_json_public_url, paper_json_files)
@@ -337,80 +591,6 @@ class GCPOps:
             logger.error(f"Error syncing paper JSON files: {str(e)}")
             return False  
 
-    # Add these methods to the GCPOps class in gcpOps.py
-
-    # def save_segmentation_data(self, segmentation_data: str, image_filename: str, 
-    #                         session_id: str, bucket_name: str) -> Optional[str]:
-    #     """
-    #     Save segmentation data to a text file in GCS bucket.
-        
-    #     Args:
-    #         segmentation_data: String containing the segmentation data
-    #         image_filename: Base filename of the image being segmented
-    #         session_id: Current session ID
-    #         bucket_name: Name of the GCS bucket for segmentation data
-            
-    #     Returns:
-    #         Optional[str]: Public URL of the saved segmentation file, or None if error
-    #     """
-    #     try:
-    #         # Create temporary file
-    #         with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as temp_file:
-    #             temp_file.write(segmentation_data)
-    #             temp_path = temp_file.name
-                
-    #         try:
-    #             # Upload to GCS
-    #             bucket = self.storage_client.bucket(bucket_name)
-    #             blob_name = f"{session_id}/{image_filename}.txt"
-    #             blob = bucket.blob(blob_name)
-                
-    #             blob.upload_from_filename(temp_path)
-                
-    #             # Generate public URL
-    #             public_url = f"https://storage.googleapis.com/{bucket_name}/{blob_name}"
-    #             logger.info(f"Saved segmentation data to {public_url}")
-                
-    #             return public_url
-                
-    #         finally:
-    #             # Clean up temp file
-    #             if os.path.exists(temp_path):
-    #                 os.remove(temp_path)
-                    
-    #     except Exception as e:
-    #         logger.error(f"Error saving segmentation data: {str(e)}")
-    #         return None
-            
-    # def load_segmentation_data(self, segmentation_url: str) -> Optional[str]:
-    #     """
-    #     Load segmentation data from GCS.
-        
-    #     Args:
-    #         segmentation_url: Public URL of the segmentation file
-            
-    #     Returns:
-    #         Optional[str]: Content of the segmentation file, or None if error
-    #     """
-    #     try:
-    #         bucket_name = segmentation_url.split('/')[3]
-    #         blob_path = '/'.join(segmentation_url.split('/')[4:])
-            
-    #         bucket = self.storage_client.bucket(bucket_name)
-    #         blob = bucket.blob(blob_path)
-            
-    #         if blob.exists():
-    #             return blob.download_as_string().decode('utf-8')
-    #         else:
-    #             logger.warning(f"No segmentation file found at {segmentation_url}")
-    #             return None
-                
-    #     except Exception as e:
-    #         logger.error(f"Error loading segmentation data: {str(e)}")
-    #         return None
-
-
-
     def save_segmentation_data(self, segmentation_data: str, image_filename: str, 
                             session_id: str, bucket_name: str) -> Optional[str]:
         """
@@ -426,29 +606,18 @@ class GCPOps:
             Optional[str]: Public URL of the saved segmentation file, or None if error
         """
         try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as temp_file:
-                temp_file.write(segmentation_data)
-                temp_path = temp_file.name
-                
-            try:
-                # Upload to GCS
-                bucket = self.storage_client.bucket(bucket_name)
-                blob_name = f"{session_id}/{image_filename}.txt"
-                blob = bucket.blob(blob_name)
-                
-                blob.upload_from_filename(temp_path)
-                
-                # Generate public URL
-                public_url = f"https://storage.googleapis.com/{bucket_name}/{blob_name}"
-                logger.info(f"Saved segmentation data to {public_url}")
-                
-                return public_url
-                
-            finally:
-                # Clean up temp file
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
+            # Upload the string directly instead of staging it in a temporary file
+            bucket = self.storage_client.bucket(bucket_name)
+            blob_name = f"{session_id}/{image_filename}.txt"
+            blob = bucket.blob(blob_name)
+            
+            blob.upload_from_string(segmentation_data.encode('utf-8'), content_type='text/plain')
+            
+            # Generate public URL
+            public_url = f"https://storage.googleapis.com/{bucket_name}/{blob_name}"
+            logger.info(f"Saved segmentation data to {public_url}")
+            
+            return public_url
                     
         except Exception as e:
             logger.error(f"Error saving segmentation data: {str(e)}")
@@ -465,17 +634,12 @@ class GCPOps:
             Optional[str]: Content of the segmentation file, or None if error
         """
         try:
-            bucket_name = segmentation_url.split('/')[3]
-            blob_path = '/'.join(segmentation_url.split('/')[4:])
+            bucket_name, blob_path = _parse_gcs_url(segmentation_url)
             
-            bucket = self.storage_client.bucket(bucket_name)
-            blob = bucket.blob(blob_path)
-            
-            if blob.exists():
-                return blob.download_as_string().decode('utf-8')
-            else:
+            content = self._download_text(bucket_name, blob_path)
+            if content is None:
                 logger.warning(f"No segmentation file found at {segmentation_url}")
-                return None
+            return content
                 
         except Exception as e:
             logger.error(f"Error loading segmentation data: {str(e)}")
@@ -484,23 +648,24 @@ class GCPOps:
     def get_segmentation_data(self, filename, bucket_name):
         """Get segmentation data from GCS bucket"""
         try:
-            bucket = self.storage_client.get_bucket(bucket_name)
-            blob = bucket.blob(filename)
-            
-            if not blob.exists():
-                return None
-                
-            return blob.download_as_string().decode('utf-8')
+            return self._download_text(bucket_name, filename)
             
         except Exception as e:
             logger.error(f"Error getting segmentation data: {str(e)}")
             return None
 
+    def _download_text(self, bucket_name: str, blob_name: str) -> Optional[str]:
+        """
+        Download a blob as UTF-8 text in a single request, returning None if it does not exist.
+        """
+        try:
+            return self.storage_client.bucket(bucket_name).blob(blob_name).download_as_bytes().decode('utf-8')
+        except NotFound:
+            return None
+
     def get_uploaded_files(self, bucket_name, session_id):
         try:
-            bucket = self.storage_client.get_bucket(bucket_name)
-            prefix = f"pdf/{session_id}/"
-            blobs = bucket.list_blobs(prefix=prefix)
+            blobs = self._list_blobs_cached(bucket_name, f"pdf/{session_id}/")
             
             files = []
             for blob in blobs:
@@ -533,8 +698,13 @@ class GCPOps:
             filename = os.path.basename(local_file_path)
             bucket = self.storage_client.get_bucket(bucket_name)
             blob_name = f"pdf/{session_id}/{filename}"
-            blob = bucket.blob(blob_name)
-            blob.upload_from_filename(local_file_path)
+            if os.path.getsize(local_file_path) > PARALLEL_UPLOAD_THRESHOLD:
+                self._parallel_composite_upload(bucket, blob_name, local_file_path, 'application/pdf')
+            else:
+                blob = bucket.blob(blob_name)
+                # Streams from the open file with its size known up front; nothing is staged in memory
+                blob.upload_from_filename(local_file_path, content_type='application/pdf')
+            self.invalidate_prefix(bucket_name, blob_name)
             public_url = f"https://storage.googleapis.com/{bucket_name}/{blob_name}"
             return blob_name, public_url
         except Exception as e:
@@ -542,6 +712,39 @@ class GCPOps:
             return None
         
 
+    @staticmethod
+    def _parallel_composite_upload(bucket: storage.Bucket, blob_name: str, local_file_path: str,
+                                   content_type: str) -> storage.Blob:
+        """
+        Upload a large file as shards in parallel, then compose them into blob_name and delete the shards.
+        """
+        size = os.path.getsize(local_file_path)
+        # Grow the shards if needed so the file fits in a single compose call
+        shard_size = max(PARALLEL_UPLOAD_SHARD_SIZE, -(-size // GCS_MAX_COMPOSE_SOURCES))
+        offsets = list(range(0, size, shard_size))
+        part_blobs = [bucket.blob(f"{blob_name}.part{i}") for i in range(len(offsets))]
+
+        def upload_shard(index: int) -> None:
+            offset = offsets[index]
+            with open(local_file_path, 'rb') as f:
+                f.seek(offset)
+                part_blobs[index].upload_from_file(
+                    f, size=min(shard_size, size - offset), content_type=content_type
+                )
+
+        try:
+            with ThreadPoolExecutor(max_workers=min(PARALLEL_UPLOAD_MAX_WORKERS, len(offsets))) as executor:
+                list(executor.map(upload_shard, range(len(offsets))))
+
+            blob = bucket.blob(blob_name)
+            blob.content_type = content_type
+            blob.compose(part_blobs)
+            logger.info(f"Uploaded {local_file_path} to {blob_name} in {len(part_blobs)} parallel parts")
+            return blob
+        finally:
+            # Best-effort cleanup; missing shards (e.g. after a failed upload) are ignored
+            bucket.delete_blobs(part_blobs, on_error=lambda blob: None)
+
     def update_paper_json_files(self, PAPER_JSON_FILES, TEMP_JSON_FILES):
         """
         Update PAPER_JSON_FILES by adding elements from TEMP_JSON_FILES.
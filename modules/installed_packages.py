@@ -1,17 +1,17 @@
-import subprocess
-import sys
-import json
+from functools import cache
+from importlib.metadata import distributions
+
+@cache
+def _read_installed_packages():
+    # Read package metadata in-process instead of spawning pip
+    return {dist.metadata['Name']: dist.version for dist in distributions()}
 
 def get_installed_packages():
-    # Run pip list command and capture the output
-    result = subprocess.run([sys.executable, '-m', 'pip', 'list', '--format=json'], 
-                          capture_output=True, text=True)
-    
-    # Parse the JSON output
-    packages = json.loads(result.stdout)
-    
-    # Create a dictionary of package names and versions
-    return {package['name']: package['version'] for package in packages}
+    # Return a copy so a caller's changes do not leak into the cached result
+    return dict(_read_installed_packages())
 
-# Get the dictionary of installed packages
-installed_packages = get_installed_packages()
\ No newline at end of file
+def __getattr__(name):
+    # Build the installed_packages dictionary on first access rather than at import
+    if name == 'installed_packages':
+        return get_installed_packages()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,14 +1,27 @@
 import os
-import tempfile
 import requests
+from requests.adapters import HTTPAdapter
 import hashlib
-import shutil
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any, Tuple
 from urllib.parse import urlparse
 import fitz  # PyMuPDF
 from google.cloud import storage
 from dotenv import load_dotenv
+from .gcpOps import _get_storage_client
+
+# Concurrent image uploads per PDF; each upload mostly waits on the network. Keep within
+# gcpOps.GCS_HTTP_POOL_SIZE, the connection pool of the shared storage client.
+IMAGE_UPLOAD_MAX_WORKERS = 16
+
+# Read size for streamed PDF downloads
+PDF_DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Keep-alive pool and per-read timeout for PDF downloads
+HTTP_POOL_CONNECTIONS = 16
+HTTP_POOL_MAXSIZE = 32
+HTTP_TIMEOUT = 30
 
 
 class PDFOps:
@@ -23,37 +36,42 @@ class PDFOps:
         self.secret_json = os.getenv('GOOGLE_SECRET_JSON')
         if not self.secret_json:
             raise ValueError("GOOGLE_SECRET_JSON environment variable not found")
+        self._bucket_cache: Dict[str, storage.Bucket] = {}
+        # Shared session so repeated PDF downloads reuse their connections
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS,
+                                                    pool_maxsize=HTTP_POOL_MAXSIZE))
     
     def _get_storage_client(self) -> storage.Client:
         """
-        Get authenticated Google Cloud Storage client.
+        Get authenticated Google Cloud Storage client, the pooled client shared with GCPOps.
         
         Returns:
             storage.Client: Authenticated GCS client
         """
-        return storage.Client.from_service_account_info(json.loads(self.secret_json))
+        return _get_storage_client(self.secret_json)
     
-    @staticmethod
-    def _get_file_hash(file_content: bytes) -> str:
+    def _get_bucket(self, bucket_name: str) -> storage.Bucket:
         """
-        Calculate SHA-256 hash of file content.
+        Get a bucket handle, reused across uploads to the same bucket.
         
         Args:
-            file_content (bytes): Content to hash
+            bucket_name (str): Name of the GCS bucket
             
         Returns:
-            str: SHA-256 hash of the content
+            storage.Bucket: Bucket handle
         """
-        return hashlib.sha256(file_content).hexdigest()
+        bucket = self._bucket_cache.get(bucket_name)
+        if bucket is None:
+            bucket = self._bucket_cache.setdefault(bucket_name, self._get_storage_client().bucket(bucket_name))
+        return bucket
     
-    @staticmethod
-    def _download_pdf(pdf_url: str, temp_path: str) -> bytes:
+    def _download_pdf(self, pdf_url: str) -> bytes:
         """
-        Download PDF from URL and save to temporary path.
+        Download PDF from URL into memory.
         
         Args:
             pdf_url (str): URL of the PDF file
-            temp_path (str): Path to save the temporary file
             
         Returns:
             bytes: Raw PDF content
@@ -61,17 +79,37 @@ class PDFOps:
         Raises:
             requests.exceptions.RequestException: If download fails
         """
-        response = requests.get(pdf_url)
+        response = self._session.get(pdf_url, timeout=HTTP_TIMEOUT)
         response.raise_for_status()
+        return response.content
+    
+    def _download_pdf_and_hash(self, pdf_url: str) -> Tuple[bytes, str]:
+        """
+        Download PDF from URL into memory, hashing each chunk as it arrives.
         
-        with open(temp_path, 'wb') as f:
-            f.write(response.content)
+        Args:
+            pdf_url (str): URL of the PDF file
             
-        return response.content
+        Returns:
+            Tuple[bytes, str]: Raw PDF content and its SHA-256 hash
+            
+        Raises:
+            requests.exceptions.RequestException: If download fails
+        """
+        with self._session.get(pdf_url, stream=True, timeout=HTTP_TIMEOUT) as response:
+            response.raise_for_status()
+            
+            hasher = hashlib.sha256()
+            chunks = []
+            for chunk in response.iter_content(chunk_size=PDF_DOWNLOAD_CHUNK_SIZE):
+                hasher.update(chunk)
+                chunks.append(chunk)
+        
+        return b"".join(chunks), hasher.hexdigest()
     
     def extract_text_from_pdf(self, pdf_url: str) -> Tuple[str, str, str]:
         """
-        Downloads PDF from URL to temp directory, extracts text content, and returns
+        Downloads PDF from URL into memory, extracts text content, and returns
         the full text, first two pages of text, and filename.
         
         Args:
@@ -83,7 +121,6 @@ class PDFOps:
                 - first_two_pages_text_content: Text content from first two pages only
                 - filename: Original filename from the PDF URL
         """
-        temp_dir = None
         try:
             # Extract filename from URL
             parsed_url = urlparse(pdf_url)
@@ -91,26 +128,17 @@ class PDFOps:
             if not filename.lower().endswith('.pdf'):
                 filename = 'unnamed.pdf'
             
-            # Create temporary directory and file
-            temp_dir = tempfile.mkdtemp()
-            temp_pdf_path = os.path.join(temp_dir, 'temp.pdf')
-            
-            # Download PDF
-            self._download_pdf(pdf_url, temp_pdf_path)
-            
-            # Extract text using PyMuPDF
-            doc = fitz.open(temp_pdf_path)
+            # Download PDF and open it straight from memory with PyMuPDF
+            pdf_content = self._download_pdf(pdf_url)
+            doc = fitz.open(stream=pdf_content, filetype="pdf")
             
             try:
-                # Process all pages for complete text
-                entire_pdf_text_content = ""
-                for page in doc:
-                    entire_pdf_text_content += page.get_text()
+                # Process all pages for complete text, joining once at the end
+                page_texts = [page.get_text("text") for page in doc]
+                entire_pdf_text_content = "".join(page_texts)
                 
-                # Process first two pages separately
-                first_two_pages_text_content = ""
-                for page_num in range(min(2, doc.page_count)):
-                    first_two_pages_text_content += doc[page_num].get_text()
+                # Reuse the text already extracted for the first two pages
+                first_two_pages_text_content = "".join(page_texts[:2])
                 
                 return entire_pdf_text_content, first_two_pages_text_content, filename
                 
@@ -120,11 +148,6 @@ class PDFOps:
         except Exception as e:
             print(f"Error processing PDF: {str(e)}")
             return "", "", ""
-            
-        finally:
-            # Clean up temp directory and its contents
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
 
     def upload_to_gcs(self, image_content: bytes, filename: str, session_id: str, bucket_name: str) -> Optional[str]:
         """
@@ -140,8 +163,7 @@ class PDFOps:
             Optional[str]: Public URL of uploaded image or None if upload fails
         """
         try:
-            client = self._get_storage_client()
-            bucket = client.bucket(bucket_name)
+            bucket = self._get_bucket(bucket_name)
 
             # Create blob path using session ID and filename
             blob_path = f"{session_id}/{filename}"
@@ -169,23 +191,15 @@ class PDFOps:
         Returns:
             Optional[Dict[str, Any]]: Dictionary containing extracted metadata and image URLs
         """
-        temp_dir = None
-        temp_path = None
-        
         try:
             # Convert GCS URL to direct download URL if needed
             pdf_url = pdf_url.replace("storage.cloud.google.com", "storage.googleapis.com")
 
-            # Create temporary directory and file
-            temp_dir = tempfile.mkdtemp()
-            temp_path = os.path.join(temp_dir, 'temp.pdf')
-            
             # Download PDF and get content
-            pdf_content = self._download_pdf(pdf_url, temp_path)
-            file_256_hash = self._get_file_hash(pdf_content)
+            pdf_content, file_256_hash = self._download_pdf_and_hash(pdf_url)
 
-            # Open PDF with PyMuPDF
-            pdf_document = fitz.open(temp_path)
+            # Open PDF with PyMuPDF directly from the downloaded bytes
+            pdf_document = fitz.open(stream=pdf_content, filetype="pdf")
             
             try:
                 total_pages = len(pdf_document)
@@ -199,51 +213,74 @@ class PDFOps:
                     "page_details": []
                 }
 
-                # Process each page
-                for page_num in range(total_pages):
-                    page = pdf_document[page_num]
-                    image_list = page.get_images()
+                # Images are extracted here (PyMuPDF is not thread-safe) and uploaded by a
+                # thread pool while the remaining pages are still being processed
+                with ThreadPoolExecutor(max_workers=IMAGE_UPLOAD_MAX_WORKERS) as executor:
+                    page_uploads = []
+                    # Images repeated across pages (logos, headers) are extracted and uploaded once,
+                    # matched first by xref and then by a hash of the image bytes
+                    xref_uploads = {}
+                    hash_uploads = {}
 
-                    page_info = {
-                        "page_index": page_num,
-                        "total_pages": total_pages,
-                        "has_images": len(image_list) > 0,
-                        "num_images": len(image_list),
-                        "image_urls": []
-                    }
+                    # Process each page
+                    for page_num, page in enumerate(pdf_document):
+                        image_list = page.get_images()
 
-                    if image_list:
+                        page_info = {
+                            "page_index": page_num,
+                            "total_pages": total_pages,
+                            "has_images": len(image_list) > 0,
+                            "num_images": len(image_list),
+                            "image_urls": []
+                        }
+
+                        uploads = []
                         for img_idx, img in enumerate(image_list, 1):
                             try:
-                                # Extract and upload image
+                                # Extract image and queue its upload unless it was already seen
                                 xref = img[0]
-                                base_image = pdf_document.extract_image(xref)
-                                image_filename = f"{file_256_hash}_image_{img_idx}.jpeg"
-                                
-                                image_url = self.upload_to_gcs(
-                                    image_content=base_image["image"],
-                                    filename=image_filename,
-                                    session_id=session_id,
-                                    bucket_name=bucket_name
-                                )
-
-                                if image_url:
-                                    page_info["image_urls"].append(image_url)
-                                    result["paper_image_urls"].append(image_url)
+                                upload = xref_uploads.get(xref)
+                                if upload is None:
+                                    base_image = pdf_document.extract_image(xref)
+                                    image_hash = hashlib.sha256(base_image["image"]).hexdigest()
+                                    upload = hash_uploads.get(image_hash)
+                                    if upload is None:
+                                        # Page number keeps names unique across pages, so parallel uploads never share a blob
+                                        image_filename = f"{file_256_hash}_p{page_num}_image_{img_idx}.jpeg"
+                                        upload = executor.submit(
+                                            self.upload_to_gcs,
+                                            image_content=base_image["image"],
+                                            filename=image_filename,
+                                            session_id=session_id,
+                                            bucket_name=bucket_name
+                                        )
+                                        hash_uploads[image_hash] = upload
+                                    xref_uploads[xref] = upload
+                                uploads.append(upload)
 
                             except Exception as e:
                                 print(f"Error processing image {img_idx} on page {page_num + 1}: {str(e)}")
 
-                    # Update total_images count and append page info
-                    result["total_images"] += page_info["num_images"]
-                    result["images_in_doc"].append(page_info)
+                        page_uploads.append((page_info, uploads))
 
-                    if page_info["has_images"]:
-                        result["page_details"].append({
-                            "page_index": page_num,
-                            "num_images": page_info["num_images"],
-                            "image_urls": page_info["image_urls"]
-                        })
+                    # Collect URLs in page and image order
+                    for page_info, uploads in page_uploads:
+                        for upload in uploads:
+                            image_url = upload.result()
+                            if image_url:
+                                page_info["image_urls"].append(image_url)
+                                result["paper_image_urls"].append(image_url)
+
+                        # Update total_images count and append page info
+                        result["total_images"] += page_info["num_images"]
+                        result["images_in_doc"].append(page_info)
+
+                        if page_info["has_images"]:
+                            result["page_details"].append({
+                                "page_index": page_info["page_index"],
+                                "num_images": page_info["num_images"],
+                                "image_urls": page_info["image_urls"]
+                            })
 
                 return result
 
@@ -253,13 +290,6 @@ class PDFOps:
         except Exception as e:
             print(f"Error processing PDF: {str(e)}")
             return None
-            
-        finally:
-            # Clean up temporary files
-            if temp_path and os.path.exists(temp_path):
-                os.unlink(temp_path)
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
 
 
 # Example usage:
@@ -0,0 +1,90 @@
+import atexit
+import logging
+import threading
+from typing import Callable, Optional
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Upper bound for the retry delay after repeated failed saves
+MAX_RETRY_DELAY = 300.0
+
+class SaveQueue:
+    """
+    Coalesce bursts of save requests into a single call of save_func after a quiet period.
+    """
+
+    def __init__(self, save_func: Callable[[], bool], delay: float = 2.0):
+        """
+        Args:
+            save_func: Callable that persists the current state and returns True on success
+            delay: Seconds to wait after the last schedule() call before saving
+        """
+        self.save_func = save_func
+        self.delay = delay
+        self._timer: Optional[threading.Timer] = None
+        self._pending = False
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        # Consecutive failed saves, used to back off the retry timer
+        self._failures = 0
+
+        # Make sure queued changes are written when the process shuts down
+        atexit.register(self.flush)
+
+    def schedule(self) -> None:
+        """
+        Mark state as dirty and (re)start the debounce timer.
+        """
+        with self._lock:
+            self._pending = True
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> bool:
+        """
+        Run save_func now if there are pending changes. A failed save stays pending and is
+        retried on a backoff timer.
+
+        Returns:
+            bool: True if nothing was pending or the save succeeded, False otherwise
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return True
+            self._pending = False
+
+        with self._save_lock:
+            try:
+                success = self.save_func()
+            except Exception as e:
+                logger.error(f"Error running queued save: {str(e)}")
+                success = False
+
+        with self._lock:
+            if success:
+                self._failures = 0
+                return True
+
+            # Keep the changes pending and retry on our own, backing off after each failure
+            self._pending = True
+            self._failures += 1
+            retry_delay = min(self.delay * 2 ** self._failures, MAX_RETRY_DELAY)
+            logger.error(f"Queued save failed ({self._failures} in a row); retrying in {retry_delay:.1f}s")
+            # A schedule() that arrived during the save has already armed a timer
+            if self._timer is None:
+                self._timer = threading.Timer(retry_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        return False
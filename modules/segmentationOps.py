@@ -1,7 +1,17 @@
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import warnings
+from typing import List, Dict, Any, Optional, Tuple, Union
 import numpy as np
 
+# Segmentation class id -> label text
+_LABEL_MAP = {
+    0: "Incomplete Diatom",
+    1: "Complete Diatom",
+    2: "Fragmented Diatom",
+    3: "Blurred Diatom",
+    4: "Diatom SideView"
+}
+
 class SegmentationOps:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
@@ -9,11 +19,15 @@ class SegmentationOps:
     def normalize_coordinates(self, x: float, y: float, image_width: float, image_height: float) -> Tuple[float, float]:
         """
         Convert actual coordinates to normalized (0-1) range.
+
+        Deprecated: use normalize_batch; this wrapper will be removed in a future release.
         """
+        warnings.warn("normalize_coordinates is deprecated; use normalize_batch", DeprecationWarning, stacklevel=2)
         try:
-            norm_x = x / image_width
-            norm_y = y / image_height
-            return (norm_x, norm_y)
+            # Raise on a zero size, as the scalar division did, instead of returning inf
+            with np.errstate(divide='raise', invalid='raise'):
+                norm_x, norm_y = self.normalize_batch([[x, y]], image_width, image_height)[0]
+            return (float(norm_x), float(norm_y))
         except Exception as e:
             self.logger.error(f"Error normalizing coordinates: {str(e)}")
             return (0.0, 0.0)
@@ -21,26 +35,40 @@ class SegmentationOps:
     def denormalize_coordinates(self, norm_x: float, norm_y: float, image_width: float, image_height: float) -> Tuple[float, float]:
         """
         Convert normalized coordinates to actual image coordinates.
+
+        Deprecated: use denormalize_batch; this wrapper will be removed in a future release.
         """
+        warnings.warn("denormalize_coordinates is deprecated; use denormalize_batch", DeprecationWarning, stacklevel=2)
         try:
-            x = norm_x * image_width
-            y = norm_y * image_height
-            return (x, y)
+            x, y = self.denormalize_batch([[norm_x, norm_y]], image_width, image_height)[0]
+            return (float(x), float(y))
         except Exception as e:
             self.logger.error(f"Error denormalizing coordinates: {str(e)}")
             return (0.0, 0.0)
 
+    def normalize_batch(self, points: np.ndarray, image_width: float, image_height: float) -> np.ndarray:
+        """
+        Convert an (N, 2) array of actual coordinates to normalized (0-1) range.
+        """
+        return np.asarray(points, dtype=np.float64) / np.array([image_width, image_height], dtype=np.float64)
+
+    def denormalize_batch(self, points: np.ndarray, image_width: float, image_height: float) -> np.ndarray:
+        """
+        Convert an (N, 2) array of normalized coordinates to actual image coordinates.
+        """
+        return np.asarray(points, dtype=np.float64) * np.array([image_width, image_height], dtype=np.float64)
+
     def parse_segmentation_line(self, line: str) -> Tuple[int, str]:
         """
         Parse segmentation line into label and points string.
         """
         try:
-            parts = line.strip().split(' ')
-            if len(parts) < 3:
+            # Split off the label without breaking the points into a list and joining them back
+            label_str, _, points_string = line.strip().partition(' ')
+            if points_string.count(' ') < 1:  # Need a label and at least two values
                 return (None, "")
             
-            label = int(parts[0])
-            points_string = ' '.join(parts[1:])
+            label = int(label_str)
             return (label, points_string)
         except Exception as e:
             self.logger.error(f"Error parsing segmentation line: {str(e)}")
@@ -69,29 +97,27 @@ class SegmentationOps:
             self.logger.error(f"Error parsing segmentation file: {str(e)}")
             return []
 
-    def calculate_bbox_overlap(self, points: List[str], bbox: str, image_width: float, image_height: float) -> float:
+    def calculate_bbox_overlap(self, points: Union[List[str], np.ndarray], bbox: str,
+                               image_width: float, image_height: float) -> float:
         """
         Calculate percentage of points that fall within bbox.
+        
+        points may be the split points string or an already-parsed float array.
         """
         try:
-            if not points or not bbox:
+            if len(points) == 0 or not bbox:
                 return 0.0
 
-            bbox_coords = [float(x) for x in bbox.split(',')]
-            x1, y1, x2, y2 = bbox_coords
+            x1, y1, x2, y2 = [float(x) for x in bbox.split(',')]
             
-            points_inside = 0
-            total_points = len(points) // 2
+            # Denormalize all (x, y) pairs at once and test them against the bbox together
+            coords = self.denormalize_batch(np.asarray(points, dtype=np.float64).reshape(-1, 2),
+                                            image_width, image_height)
+            x = coords[:, 0]
+            y = coords[:, 1]
+            inside = (x >= x1) & (x <= x2) & (y >= y1) & (y <= y2)
             
-            for i in range(0, len(points), 2):
-                norm_x = float(points[i])
-                norm_y = float(points[i + 1])
-                x, y = self.denormalize_coordinates(norm_x, norm_y, image_width, image_height)
-                
-                if x1 <= x <= x2 and y1 <= y <= y2:
-                    points_inside += 1
-            
-            return points_inside / total_points if total_points > 0 else 0.0
+            return float(inside.mean()) if len(inside) > 0 else 0.0
             
         except Exception as e:
             self.logger.error(f"Error calculating bbox overlap: {str(e)}")
@@ -111,7 +137,8 @@ class SegmentationOps:
                 return False
                 
             try:
-                [float(p) for p in points]  # Validate all points are numbers
+                # Validate all points are numbers with a single array conversion
+                np.asarray(points, dtype=np.float64)
             except ValueError:
                 return False
                 
@@ -127,23 +154,21 @@ class SegmentationOps:
         Find bbox that best encloses the segmentation points.
         """
         try:
-            points = points_string.split()
-            max_overlap = threshold
-            best_bbox = None
+            coords = np.asarray(points_string.split(), dtype=np.float64).reshape(-1, 2)
+            if not bboxes:
+                return None
             
-            for bbox in bboxes:
-                overlap = self.calculate_bbox_overlap(
-                    points, 
-                    bbox['bbox'], 
-                    image_width, 
-                    image_height
-                )
-                
-                if overlap > max_overlap:
-                    max_overlap = overlap
-                    best_bbox = bbox
+            # Fraction of points inside each bbox, for all bboxes at once: (B, 1) bounds against (N,) points
+            bbox_coords = self._parse_bboxes(bboxes)
+            coords = self.denormalize_batch(coords, image_width, image_height)
+            x = coords[:, 0]
+            y = coords[:, 1]
+            inside = ((x >= bbox_coords[:, 0:1]) & (x <= bbox_coords[:, 2:3]) &
+                      (y >= bbox_coords[:, 1:2]) & (y <= bbox_coords[:, 3:4]))
+            overlaps = inside.mean(axis=1) if len(coords) > 0 else np.zeros(len(bboxes))
             
-            return best_bbox
+            best = int(np.argmax(overlaps))
+            return bboxes[best] if overlaps[best] > threshold else None
             
         except Exception as e:
             self.logger.error(f"Error finding matching bbox: {str(e)}")
@@ -153,42 +178,36 @@ class SegmentationOps:
         """
         Convert numeric label to text description.
         """
-        label_map = {
-            0: "Incomplete Diatom",
-            1: "Complete Diatom",
-            2: "Fragmented Diatom",
-            3: "Blurred Diatom",
-            4: "Diatom SideView"
-        }
-        return label_map.get(label, "Unknown")
+        return _LABEL_MAP.get(label, "Unknown")
 
-    def get_bbox_from_denormalized_points(self, denormalized_points_str: str) -> str:
+    def get_bbox_from_denormalized_points(self, denormalized_points: Union[str, np.ndarray]
+                                          ) -> Optional[Tuple[float, float, float, float]]:
         """
-        Convert denormalized segmentation points to bbox format "x1,y1,x2,y2"
-        where (x1,y1) is top-left corner and (x2,y2) is bottom-right corner
+        Convert denormalized segmentation points to a bbox (x1, y1, x2, y2)
+        where (x1,y1) is top-left corner and (x2,y2) is bottom-right corner.
+        
+        denormalized_points may be the space-separated points string or an (N, 2) array.
         """
         try:
-            points = [float(p) for p in denormalized_points_str.split()]
-            x_coords = points[0::2]  # [x1, x2, x3, ...]
-            y_coords = points[1::2]  # [y1, y2, y3, ...]
+            if isinstance(denormalized_points, str):
+                denormalized_points = np.asarray(denormalized_points.split(), dtype=np.float64)
+            points = np.asarray(denormalized_points).reshape(-1, 2)
             
-            x1 = min(x_coords)
-            y1 = min(y_coords)
-            x2 = max(x_coords)
-            y2 = max(y_coords)
-            
-            return f"{x1},{y1},{x2},{y2}"
+            x1, y1 = (float(v) for v in points.min(axis=0))
+            x2, y2 = (float(v) for v in points.max(axis=0))
+            return (x1, y1, x2, y2)
         except Exception as e:
             self.logger.error(f"Error getting bbox from denormalized points: {str(e)}")
-            return ""
+            return None
 
-    def calculate_bbox_overlap_ratio(self, denorm_points_bbox: str, bbox: str) -> float:
+    def calculate_bbox_overlap_ratio(self, denorm_points_bbox: Tuple[float, float, float, float],
+                                     bbox: Tuple[float, float, float, float]) -> float:
         """
-        Calculate overlap ratio between denormalized points bbox and target bbox
+        Calculate overlap ratio between denormalized points bbox and target bbox, both as (x1, y1, x2, y2)
         """
         try:
-            dp_x1, dp_y1, dp_x2, dp_y2 = map(float, denorm_points_bbox.split(','))
-            b_x1, b_y1, b_x2, b_y2 = map(float, bbox.split(','))
+            dp_x1, dp_y1, dp_x2, dp_y2 = denorm_points_bbox
+            b_x1, b_y1, b_x2, b_y2 = bbox
             
             # Calculate intersection
             x_left = max(dp_x1, b_x1)
@@ -208,6 +227,35 @@ class SegmentationOps:
             self.logger.error(f"Error calculating bbox overlap ratio: {str(e)}")
             return 0.0
 
+    def _parse_bboxes(self, bboxes: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Parse the "x1,y1,x2,y2" bbox strings into a (B, 4) float array; unparseable bboxes become NaN rows.
+        """
+        parsed = np.full((len(bboxes), 4), np.nan)
+        for i, bbox in enumerate(bboxes):
+            try:
+                parsed[i] = [float(v) for v in bbox['bbox'].split(',')]
+            except Exception:
+                continue
+        return parsed
+
+    @staticmethod
+    def _overlap_ratios(denorm_points_bbox: Tuple[float, float, float, float], bbox_coords: np.ndarray) -> np.ndarray:
+        """
+        Fraction of the denormalized points bbox covered by each of the (B, 4) bboxes; NaN rows give 0.
+        """
+        dp_x1, dp_y1, dp_x2, dp_y2 = denorm_points_bbox
+        x_left = np.maximum(dp_x1, bbox_coords[:, 0])
+        y_top = np.maximum(dp_y1, bbox_coords[:, 1])
+        x_right = np.minimum(dp_x2, bbox_coords[:, 2])
+        y_bottom = np.minimum(dp_y2, bbox_coords[:, 3])
+        intersects = (x_right >= x_left) & (y_bottom >= y_top)
+        intersection_area = np.where(intersects, (x_right - x_left) * (y_bottom - y_top), 0.0)
+        denorm_points_area = (dp_x2 - dp_x1) * (dp_y2 - dp_y1)
+        if denorm_points_area > 0:
+            return intersection_area / denorm_points_area
+        return np.zeros(len(bbox_coords))
+
     def process_image_segmentations(self, image_data: Dict[str, Any], segmentation_text: str) -> Dict[str, Any]:
         """
         Process and align segmentations with bboxes for an image.
@@ -220,8 +268,9 @@ class SegmentationOps:
             image_height = float(image_data.get('image_height', 768))
             bboxes = image_data.get('info', [])
             
-            # Parse segmentations
+            # Parse segmentations, and every candidate bbox once up front
             segmentations = self.parse_segmentation_file(segmentation_text)
+            bbox_coords = self._parse_bboxes(bboxes) if segmentations else np.empty((0, 4))
             
             # Process each segmentation
             for seg in segmentations:
@@ -236,17 +285,14 @@ class SegmentationOps:
                 seg_dict['segmentation_points'] = seg['points_string']
                 seg_dict['points_count'] = seg['points_count']
                 
-                # Calculate denormalized points
-                points = seg['points_string'].split()
-                denormalized = []
-                for i in range(0, len(points), 2):
-                    x = float(points[i]) * image_width
-                    y = float(points[i + 1]) * image_height
-                    denormalized.extend([str(round(x)), str(round(y))])
-                seg_dict['denormalized_segmentation_points'] = ' '.join(denormalized)
+                # Calculate denormalized points, parsing the points string only once
+                coords = np.asarray(seg['points_string'].split(), dtype=np.float64).reshape(-1, 2)
+                denormalized = np.round(self.denormalize_batch(coords, image_width, image_height)).astype(np.int64)
+                seg_dict['denormalized_segmentation_points'] = ' '.join(map(str, denormalized.ravel().tolist()))
                 
-                # Calculate denormalized points bbox
-                seg_dict['denorm_points_bbox'] = self.get_bbox_from_denormalized_points(seg_dict['denormalized_segmentation_points'])
+                # Calculate denormalized points bbox from the rounded points; the string is only built for output
+                denorm_points_bbox = self.get_bbox_from_denormalized_points(denormalized)
+                seg_dict['denorm_points_bbox'] = ','.join(str(v) for v in denorm_points_bbox)
                 
                 # Initialize default values
                 seg_dict['bbox'] = ""
@@ -254,16 +300,16 @@ class SegmentationOps:
                 seg_dict['species'] = ""
                 seg_dict['overlap_ratio'] = 0.0
                 
-                # Find matching bbox using overlap ratio
+                # Find matching bbox using overlap ratio, against all bboxes at once
+                overlaps = self._overlap_ratios(denorm_points_bbox, bbox_coords)
+                
                 max_overlap = 0.0
                 matching_bbox = None
-                
-                for bbox in bboxes:
-                    overlap = self.calculate_bbox_overlap_ratio(seg_dict['denorm_points_bbox'], bbox['bbox'])
-                    
-                    if overlap > max_overlap and overlap >= 0.5:  # At least 50% overlap required
-                        max_overlap = overlap
-                        matching_bbox = bbox
+                if len(bboxes) > 0:
+                    best = int(np.argmax(overlaps))
+                    if overlaps[best] >= 0.5:  # At least 50% overlap required
+                        max_overlap = float(overlaps[best])
+                        matching_bbox = bboxes[best]
                 
                 if matching_bbox:
                     seg_dict['bbox'] = matching_bbox['bbox']
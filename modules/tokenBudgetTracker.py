@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, List, Optional
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class TokenBudgetTracker:
+    """
+    Throttle requests so the tokens used in a rolling window stay under a tokens-per-minute limit.
+    """
+
+    def __init__(self, tokens_per_minute: int, window: float = 60.0):
+        """
+        Args:
+            tokens_per_minute: Maximum tokens allowed within one window
+            window: Length of the rolling window in seconds
+        """
+        self.tokens_per_minute = tokens_per_minute
+        self.window = window
+        # Each entry is a mutable [timestamp, tokens] pair so reservations can be corrected later
+        self._usage: Deque[List[float]] = deque()
+
+    def _prune(self, now: float) -> None:
+        while self._usage and self._usage[0][0] <= now - self.window:
+            self._usage.popleft()
+
+    def tokens_in_window(self) -> int:
+        """
+        Returns:
+            int: Tokens recorded or reserved within the current window
+        """
+        self._prune(time.monotonic())
+        return int(sum(tokens for _, tokens in self._usage))
+
+    async def acquire(self, estimated_tokens: int) -> List[float]:
+        """
+        Wait until estimated_tokens fit in the budget, then reserve them.
+
+        Args:
+            estimated_tokens: Expected token usage of the next request
+
+        Returns:
+            List[float]: Reservation to pass to record_usage once the actual usage is known
+        """
+        while True:
+            now = time.monotonic()
+            self._prune(now)
+            used = sum(tokens for _, tokens in self._usage)
+
+            # A request larger than the whole budget is let through once the window is empty
+            if used + estimated_tokens <= self.tokens_per_minute or not self._usage:
+                reservation = [now, estimated_tokens]
+                self._usage.append(reservation)
+                return reservation
+
+            delay = max(self._usage[0][0] + self.window - now, 0.05)
+            logger.info("Token budget exhausted (%d/%d); waiting %.1fs", used, self.tokens_per_minute, delay)
+            await asyncio.sleep(delay)
+
+    def record_usage(self, tokens: int, reservation: Optional[List[float]] = None) -> None:
+        """
+        Record the actual tokens used by a request.
+
+        Args:
+            tokens: Input plus output tokens reported by the API
+            reservation: Reservation returned by acquire, which is updated in place
+        """
+        if reservation is not None:
+            reservation[1] = tokens
+        else:
+            self._usage.append([time.monotonic(), tokens])